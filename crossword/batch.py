@@ -0,0 +1,156 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import time
+
+from crossword import *
+from generate import CrosswordCreator
+
+# Vocabulary shared by every structure a worker solves
+shared = dict()
+
+
+def read_manifest(filename):
+    """
+    Returns (structure, output) pairs from a manifest with one structure
+    file per line, optionally followed by an image file to save it to.
+    Blank lines and lines starting with # are skipped, and relative paths
+    are taken from the directory of the manifest.
+    """
+    directory = os.path.dirname(filename)
+    jobs = []
+    with open(filename) as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) > 2:
+                raise ValueError(f"{filename}: too many fields in {line!r}")
+            paths = [os.path.join(directory, field) for field in fields]
+            jobs.append((paths[0], paths[1] if len(paths) == 2 else None))
+    return jobs
+
+
+def initialize(words, options, timeout):
+    """
+    Loads the vocabulary when a worker process starts, unless it was
+    inherited already loaded from the parent.
+    """
+    if "index" not in shared:
+        shared["index"] = WordIndex.load(words)
+    shared["words"] = words
+    shared["options"] = options
+    shared["timeout"] = timeout
+
+
+def expire(signum, frame):
+    """Abandons the current job when its timer goes off."""
+    raise TimeoutError(f"gave up after {shared['timeout']}s")
+
+
+def generate(job):
+    """
+    Solves one structure and saves it if it has an output. Returns a record
+    of the result with the time spent in each step. A job that runs past
+    the timeout, if any, is abandoned and reported as timed out.
+    """
+    structure, output = job
+    record = {"structure": structure, "output": output, "seconds": dict()}
+    if shared["timeout"] is not None:
+        signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, shared["timeout"])
+    try:
+        start = time.perf_counter()
+        crossword = Crossword(structure, shared["words"], shared["index"])
+        creator = CrosswordCreator(crossword, **shared["options"])
+        record["seconds"]["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assignment = creator.solve()
+        record["seconds"]["solve"] = time.perf_counter() - start
+        record["stats"] = creator.stats
+
+        if assignment is None:
+            record["status"] = "unsolvable"
+            return record
+        record["status"] = "solved"
+        record["grid"] = [
+            "".join(
+                (letter or " ") if crossword.structure[i][j] else "#"
+                for j, letter in enumerate(row)
+            )
+            for i, row in enumerate(creator.letter_grid(assignment))
+        ]
+
+        if output:
+            start = time.perf_counter()
+            creator.save(assignment, output)
+            record["seconds"]["render"] = time.perf_counter() - start
+    except TimeoutError as e:
+        record["status"] = "timeout"
+        record["error"] = str(e)
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = repr(e)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate every crossword in a manifest."
+    )
+    parser.add_argument("manifest",
+                        help="file with a structure and optional image per line")
+    parser.add_argument("words")
+    parser.add_argument("--results", default="results.jsonl",
+                        help="file to write one JSON result per line to")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--timeout", type=float,
+                        help="seconds to spend on each structure")
+    parser.add_argument("--inference", default="mac",
+                        choices=[str(i) for i in CrosswordCreator.INFERENCES])
+    parser.add_argument("--ordering", default="lcv",
+                        choices=[str(o) for o in CrosswordCreator.ORDERINGS])
+    args = parser.parse_args()
+
+    jobs = read_manifest(args.manifest)
+    options = {
+        "inference": None if args.inference == "None" else args.inference,
+        "ordering": None if args.ordering == "None" else args.ordering
+    }
+    workers = args.workers or os.cpu_count() or 1
+
+    # Load the vocabulary once, for forked workers to inherit
+    start = time.perf_counter()
+    shared["index"] = WordIndex.load(args.words)
+    print(f"Loaded {len(shared['index'])} words in "
+          f"{time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    counts = dict()
+    failures = []
+    with open(args.results, "w") as f, multiprocessing.Pool(
+        workers, initializer=initialize,
+        initargs=(args.words, options, args.timeout)
+    ) as pool:
+        for record in pool.imap_unordered(generate, jobs):
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            if record["status"] in ("error", "timeout"):
+                failures.append(record)
+
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"Generated {len(jobs)} crosswords in "
+          f"{time.perf_counter() - start:.3f}s: {summary}")
+    for record in failures:
+        print(f"Failed {record['structure']}: {record['error']}")
+    print(f"Wrote results to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
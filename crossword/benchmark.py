@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from crossword import *
+from generate import CrosswordCreator
+
+# Solver configurations to compare, by name
+CONFIGS = {
+    "backtracking": {"inference": None, "ordering": None},
+    "forward": {"inference": "forward", "ordering": "lcv"},
+    "mac": {"inference": "mac", "ordering": "lcv"},
+    "mac-sampled": {"inference": "mac", "ordering": "sampled"},
+    "mac-restarts": {"inference": "mac", "ordering": "lcv", "seed": 0,
+                     "restarts": 100}
+}
+
+
+def generate_structure(size, density, seed=0):
+    """
+    Generate a `size` by `size` crossword structure as a list of lines,
+    with about a fraction `density` of open cells. Blocked cells are placed
+    at random with the rotational symmetry of published crosswords.
+    """
+    rng = random.Random(seed)
+    open_cells = [[True] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            if (i, j) <= (size - 1 - i, size - 1 - j) and \
+                    rng.random() >= density:
+                open_cells[i][j] = False
+                open_cells[size - 1 - i][size - 1 - j] = False
+    return [
+        "".join("_" if cell else "#" for cell in row) for row in open_cells
+    ]
+
+
+def run(crossword, config, connection):
+    """
+    Solve `crossword` with configuration `config` in a child process and
+    send back whether it was solved and the solver's stats.
+    """
+    try:
+        creator = CrosswordCreator(crossword, **CONFIGS[config])
+        assignment = creator.solve()
+        solved = assignment is not None and creator.consistent(assignment)
+        connection.send(("ok", solved, creator.stats))
+    except Exception as e:
+        connection.send(("error", repr(e)))
+    finally:
+        connection.close()
+
+
+def measure(crossword, config, timeout):
+    """
+    Benchmark one configuration on one crossword, giving up after `timeout`
+    seconds. Returns a dict with its status ("ok", "timeout" or "error"),
+    whether it was solved, wall time and the solver's stats.
+    """
+    result = {"config": config, "status": "timeout", "solved": None,
+              "seconds": None, "stats": None}
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=run, args=(crossword, config, sender)
+    )
+    start = time.perf_counter()
+    process.start()
+    sender.close()
+
+    try:
+        if receiver.poll(timeout):
+            message = receiver.recv()
+            result["seconds"] = time.perf_counter() - start
+            if message[0] == "ok":
+                result.update(status="ok", solved=message[1],
+                              stats=message[2])
+            else:
+                result.update(status="error", error=message[1])
+    except EOFError:
+        result["status"] = "error"
+
+    if process.is_alive():
+        process.terminate()
+    process.join()
+    receiver.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark crossword solver configurations."
+    )
+    parser.add_argument("--words", nargs="+",
+                        default=["data/words1.txt", "data/words2.txt"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 7, 9, 11])
+    parser.add_argument("--densities", type=float, nargs="+",
+                        default=[0.6, 0.75, 0.9])
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="structures of each size, with successive seeds")
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS),
+                        default=list(CONFIGS))
+    parser.add_argument("--timeout", type=float, default=30,
+                        help="seconds before a configuration is stopped")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json",
+                        help="file to write results to as JSON")
+    args = parser.parse_args()
+
+    columns = ("words", "size", "density", "vars", "config", "status",
+               "solved", "time (s)", "nodes", "backtracks", "revisions",
+               "wipeouts")
+    row = "{:>12} {:>4} {:>7} {:>4} {:>12} {:>7} {:>6} {:>8} {:>8} " \
+          "{:>10} {:>9} {:>8}"
+    print(row.format(*columns))
+
+    records = []
+    with tempfile.TemporaryDirectory(
+        prefix="crossword-benchmark-"
+    ) as directory:
+        for words in args.words:
+            index = WordIndex.load(words)
+            for size in args.sizes:
+                for density in args.densities:
+                    for i in range(args.repeat):
+                        seed = args.seed + i
+                        structure = os.path.join(
+                            directory, f"structure-{size}-{density}-{seed}.txt"
+                        )
+                        with open(structure, "w") as f:
+                            f.write("\n".join(
+                                generate_structure(size, density, seed)
+                            ) + "\n")
+                        crossword = Crossword(structure, words, index)
+
+                        for config in args.configs:
+                            result = measure(crossword, config, args.timeout)
+                            result.update(
+                                words=words, size=size, density=density,
+                                seed=seed, variables=len(crossword.variables)
+                            )
+                            records.append(result)
+                            stats = result["stats"] or dict()
+                            print(row.format(
+                                os.path.basename(words), size, density,
+                                len(crossword.variables), config,
+                                result["status"], str(result["solved"]),
+                                ("" if result["seconds"] is None
+                                 else f"{result['seconds']:.3f}"),
+                                stats.get("nodes", ""),
+                                stats.get("backtracks", ""),
+                                stats.get("revisions", ""),
+                                stats.get("wipeouts", "")
+                            ))
+
+    with open(args.output, "w") as f:
+        json.dump({"arguments": vars(args), "results": records}, f, indent=2)
+    print(f"Wrote {len(records)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
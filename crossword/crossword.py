@@ -1,3 +1,7 @@
+import marshal
+import os
+
+
 class Variable():
 
     ACROSS = "across"
@@ -35,9 +39,208 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class WordIndex():
+
+    # Version of the cache format
+    CACHE_VERSION = 1
+
+    def __init__(self, buckets, table=None):
+        """
+        Index a vocabulary stored by length.
+
+        `buckets[length]` holds the words of that length, sorted and encoded
+        as Latin-1, back to back in one bytes object, so that word k is the
+        kth slice of `length` bytes. A set of words of one length is an
+        integer bitset with bit k set for word k. `table[length][position]`
+        maps each letter to the bitset of words of `length` with that letter
+        at `position`, and is built from the buckets if not given.
+        """
+        self.buckets = buckets
+        self.sizes = {
+            length: len(bucket) // length
+            for length, bucket in buckets.items()
+        }
+        if table is None:
+            table = {
+                length: [
+                    self.column(length, position) for position in range(length)
+                ]
+                for length in buckets
+            }
+        self.table = table
+
+        # Bitsets and letter counts shared by every variable of a length
+        self.full = dict()
+        self.counts = dict()
+
+    @classmethod
+    def from_words(cls, words):
+        """
+        Index an iterable of words. Empty words, and words that cannot be
+        encoded as Latin-1, are left out.
+        """
+        lengths = dict()
+        for word in set(words):
+            try:
+                encoded = word.encode("latin-1")
+            except UnicodeEncodeError:
+                continue
+            if encoded:
+                lengths.setdefault(len(encoded), []).append(encoded)
+        return cls({
+            length: b"".join(sorted(encoded))
+            for length, encoded in lengths.items()
+        })
+
+    @classmethod
+    def load(cls, words_file, cache=True):
+        """
+        Index the uppercased words in a file, one per line.
+
+        If `cache` is set, the index is also saved next to the file in
+        binary form and read back from there while the file is unchanged.
+        """
+        if not cache:
+            with open(words_file) as f:
+                return cls.from_words(f.read().upper().splitlines())
+
+        # Only trust a cache made from this exact version of the file
+        status = os.stat(words_file)
+        key = (cls.CACHE_VERSION, status.st_size, status.st_mtime_ns)
+        cache_file = words_file + ".wordcache"
+        try:
+            with open(cache_file, "rb") as f:
+                cached_key, buckets, table = marshal.loads(f.read())
+            if cached_key == key:
+                return cls(buckets, table)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        index = cls.load(words_file, cache=False)
+        try:
+            with open(cache_file, "wb") as f:
+                f.write(marshal.dumps((key, index.buckets, index.table)))
+        except OSError:
+            pass
+        return index
+
+    def column(self, length, position):
+        """
+        Return a dict from each letter at `position` of the words of `length`
+        to the bitset of words with that letter there.
+        """
+        letters = self.buckets[length][position::length]
+        column = dict()
+        for code in set(letters):
+            # Write bit k of the bitset as the kth character of a binary string
+            digits = letters.translate(bytes(
+                0x31 if c == code else 0x30 for c in range(256)
+            ))
+            column[chr(code)] = int(digits[::-1], 2)
+        return column
+
+    def all(self, length):
+        """Return the bitset of every word of `length`."""
+        if length not in self.full:
+            self.full[length] = (1 << self.sizes.get(length, 0)) - 1
+        return self.full[length]
+
+    def matching(self, length, position, letter):
+        """Return the bitset of words of `length` with `letter` at `position`."""
+        if length not in self.table:
+            return 0
+        return self.table[length][position].get(letter, 0)
+
+    def letters(self, length, position):
+        """Return a dict from each letter at `position` to its bitset."""
+        if length not in self.table:
+            return dict()
+        return self.table[length][position]
+
+    def histogram(self, length, position):
+        """
+        Return a dict from each letter at `position` to the number of words
+        of `length` with that letter there. The dict is shared, so it must
+        not be modified.
+        """
+        if (length, position) not in self.counts:
+            self.counts[length, position] = {
+                letter: bits.bit_count()
+                for letter, bits in self.letters(length, position).items()
+            }
+        return self.counts[length, position]
+
+    def word(self, length, k):
+        """Return word `k` of `length`."""
+        return self.buckets[length][k * length:(k + 1) * length].decode(
+            "latin-1"
+        )
+
+    def find(self, word):
+        """Return the id of `word`, or None if it is not in the index."""
+        try:
+            encoded = word.encode("latin-1")
+        except UnicodeEncodeError:
+            return None
+        length = len(encoded)
+        bucket = self.buckets.get(length)
+        if not bucket:
+            return None
+
+        # Binary search the sorted fixed-width words
+        low, high = 0, self.sizes[length]
+        while low < high:
+            middle = (low + high) // 2
+            if bucket[middle * length:(middle + 1) * length] < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if bucket[low * length:(low + 1) * length] == encoded:
+            return low
+        return None
+
+    def bit(self, word):
+        """Return the bitset holding only `word`."""
+        return 1 << self.find(word)
+
+    def members(self, length, bits):
+        """Yield the words of `length` in bitset `bits`, in sorted order."""
+        digits = bin(bits)[:1:-1]
+        k = digits.find("1")
+        while k != -1:
+            yield self.word(length, k)
+            k = digits.find("1", k + 1)
+
+    @staticmethod
+    def count(bits):
+        """Return the number of words in bitset `bits`."""
+        return bits.bit_count()
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self.find(word) is not None
+
+    def __iter__(self):
+        for length in sorted(self.buckets):
+            yield from self.members(length, self.all(length))
+
+    def __len__(self):
+        return sum(self.sizes.values())
+
+
+class Overlaps(dict):
+    """Overlaps between pairs of variables, None for pairs not stored."""
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword():
 
-    def __init__(self, structure_file, words_file):
+    def __init__(self, structure_file, words_file, index=None):
+        """
+        Load a crossword structure and vocabulary. If `index` is given, it
+        is used as the already loaded vocabulary of `words_file`.
+        """
 
         # Determine structure of crossword
         with open(structure_file) as f:
@@ -57,9 +260,9 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, indexed once for every heuristic to share
+        self.index = index if index is not None else WordIndex.load(words_file)
+        self.words = self.index
 
         # Determine variable set
         self.variables = set()
@@ -104,30 +307,29 @@ class Crossword():
                             length=length
                         ))
 
+        # Record which variables cover each cell
+        covering = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                covering.setdefault(cell, []).append((var, k))
+
         # Compute overlaps for each word
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs are stored, found from cells covered twice
+        self.overlaps = Overlaps()
+        adjacent = {var: set() for var in self.variables}
+        for cover in covering.values():
+            for v1, i in cover:
+                for v2, j in cover:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        adjacent[v1].add(v2)
+        self.adjacent = {
+            var: frozenset(neighbors) for var, neighbors in adjacent.items()
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.adjacent[var]
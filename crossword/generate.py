@@ -1,20 +1,380 @@
+import itertools
+import math
+import random
 import sys
+import time
+from collections import OrderedDict, deque
 
 from crossword import *
+from render import render
+
+
+def luby(i):
+    """
+    Return the `i`th element (from 1) of the Luby restart sequence.
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Restart(Exception):
+    """Raised to abandon a search that has reached its node limit."""
+
+
+# Stand-in variable, outside every grid, blamed along with the variables
+# whose words ruled out a value for being the same word. Conflicts that
+# depend on distinct words are not learned as letter patterns.
+DISTINCT = Variable(-1, -1, "distinct", 0)
 
 
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    # Ways to prune domains after each assignment during search
+    INFERENCES = ("mac", "forward", None)
+
+    # Ways to order the values of a variable during search
+    ORDERINGS = ("lcv", "sampled", None)
+
+    # Largest number of removed words to update histograms one word at a time
+    HISTOGRAM_DELTA = 32
+
+    # Nodes searched between calls to the progress callback
+    PROGRESS_INTERVAL = 1000
+
+    def __init__(self, crossword, inference="mac", ordering="lcv",
+                 sample=256, seed=None, restarts=None, nogoods=10000,
+                 callback=None):
         """
         Create new CSP crossword generate.
+
+        `inference` is "mac" to maintain arc consistency after each
+        assignment, "forward" for forward checking only, or None.
+        `ordering` is "lcv" to order every value by the number of values it
+        rules out, "sampled" to only order a random sample of `sample`
+        values ahead of the rest in larger domains, or None for word order.
+        If `seed` is given, ties between variables and between values are
+        broken at random. If `restarts` is given, search starts over after
+        `restarts` times the next element of the Luby sequence in nodes.
+        Up to `nogoods` learned nogoods are kept, dropping the least recently
+        used ones first. If `callback` is given, it is called with the name
+        of each phase and `self.stats` as the phase ends, and with "progress"
+        and `self.stats` every `PROGRESS_INTERVAL` nodes of search.
         """
+        if inference not in self.INFERENCES:
+            raise ValueError(f"unknown inference {inference!r}")
+        if ordering not in self.ORDERINGS:
+            raise ValueError(f"unknown ordering {ordering!r}")
+        self.inference = inference
+        self.ordering = ordering
+        self.sample = sample
+        self.seed = seed
+        self.random = random.Random(0 if seed is None else seed)
+        self.restarts = restarts
+        self.limit = None
+        self.callback = callback
+        self.capacity = nogoods
         self.crossword = crossword
+        self.index = crossword.index
+
+        # Each domain is a bitset of word ids in the index, shared by every
+        # variable of the same length until it is pruned
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.index.all(var.length)
+            for var in self.crossword.variables
+        }
+
+        # Domains replaced during search, as (variable, old domain, old
+        # histograms, old culprits) tuples
+        self.trail = []
+
+        # Assigned variables whose values pruned each domain
+        self.culprits = {var: frozenset() for var in self.crossword.variables}
+
+        # Learned nogoods, each a set of (cell, letter) pairs that no
+        # solution fills in all together, from least to most recently used,
+        # mapped to the two pairs watched for it, and the nogoods watching
+        # each pair. A watched pair is kept unfilled while another is, so a
+        # nogood can only be completed by filling one of its watched pairs.
+        self.nogoods = OrderedDict()
+        self.watches = dict()
+
+        # Cells each variable shares with another, as (position, cell) pairs
+        self.crossings = {
+            var: [
+                (self.crossword.overlaps[var, neighbor][0],
+                 var.cells[self.crossword.overlaps[var, neighbor][0]])
+                for neighbor in self.crossword.neighbors(var)
+            ]
+            for var in self.crossword.variables
+        }
+
+        # Variables sharing each cell
+        self.covering = dict()
+        for var, crossings in self.crossings.items():
+            for _, cell in crossings:
+                self.covering.setdefault(cell, []).append(var)
+
+        # Number of words in each domain with each letter at each shared cell
+        self.histograms = {
+            var: self.histogram(var, self.domains[var])
             for var in self.crossword.variables
         }
 
+        # Incremental state of the assignment being searched: the variable
+        # each used word is assigned to, the letter and number of assigned
+        # variables in each shared cell, and the number of variables assigned
+        self.assignment = dict()
+        self.used = dict()
+        self.letters = dict()
+        self.assigned = 0
+
+        # Variable whose domain was last wiped out
+        self.wipeout = None
+
+        # Count calls to `revise`, how many of them pruned a domain, arcs taken
+        # from the AC-3 queue, domains wiped out, nodes searched, values
+        # retracted, restarts, levels skipped by backjumping, nogoods learned
+        # and values ruled out by nogoods, and time spent in each phase
+        self.stats = {
+            "revisions": 0, "revised": 0, "arcs": 0, "wipeouts": 0,
+            "nodes": 0, "backtracks": 0, "restarts": 0, "backjumps": 0,
+            "learned": 0, "nogood hits": 0,
+            "seconds": {"node consistency": 0.0, "ac3": 0.0, "search": 0.0}
+        }
+
+    def histogram(self, var, domain):
+        """
+        Return, for each position of `var` shared with another variable, a
+        dict from letters to the number of words in `domain` with that letter
+        at that position. Full domains share the counts kept by the index.
+        """
+        if domain == self.index.all(var.length):
+            return {
+                k: self.index.histogram(var.length, k)
+                for k, _ in self.crossings[var]
+            }
+        histograms = dict()
+        for k, _ in self.crossings[var]:
+            counts = dict()
+            for letter, bits in self.index.letters(var.length, k).items():
+                count = self.index.count(domain & bits)
+                if count:
+                    counts[letter] = count
+            histograms[k] = counts
+        return histograms
+
+    def prune(self, var, domain, culprits=None):
+        """
+        Replace the domain of `var` with `domain`, keeping the old domain,
+        histograms and culprits on the trail so that they can be restored.
+        If `culprits` is given, it becomes the set of assigned variables
+        responsible for the new domain.
+        """
+        old = self.domains[var]
+        self.trail.append((var, old, self.histograms[var], self.culprits[var]))
+        self.domains[var] = domain
+        if culprits is not None:
+            self.culprits[var] = culprits
+
+        # Count removed words out of the histograms if there are only a few
+        removed = old & ~domain
+        if self.index.count(removed) > self.HISTOGRAM_DELTA:
+            self.histograms[var] = self.histogram(var, domain)
+            return
+        histograms = {
+            k: counts.copy() for k, counts in self.histograms[var].items()
+        }
+        for word in self.index.members(var.length, removed):
+            for k, counts in histograms.items():
+                counts[word[k]] -= 1
+                if not counts[word[k]]:
+                    del counts[word[k]]
+        self.histograms[var] = histograms
+
+    def undo(self, mark):
+        """
+        Restore every domain replaced since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, domain, histograms, culprits = self.trail.pop()
+            self.domains[var] = domain
+            self.histograms[var] = histograms
+            self.culprits[var] = culprits
+
+    def values(self, var):
+        """
+        Return the words in the domain of `var`.
+        """
+        return self.index.members(var.length, self.domains[var])
+
+    def load(self, assignment):
+        """
+        Reset the incremental search state to describe `assignment`.
+        """
+        self.assignment = assignment
+        self.used = dict()
+        self.letters = dict()
+        self.assigned = 0
+        for var, word in assignment.items():
+            self.place(var, word)
+
+    def place(self, var, word):
+        """
+        Record `word` as the value of `var` in the incremental search state.
+        """
+        self.used[word] = var
+        self.assigned += 1
+        for k, cell in self.crossings[var]:
+            occupied = self.letters.get(cell)
+            if occupied:
+                self.letters[cell] = (word[k], occupied[1] + 1)
+            else:
+                self.letters[cell] = (word[k], 1)
+                self.rewatch((cell, word[k]))
+
+    def holds(self, pair):
+        """
+        Return True if the (cell, letter) `pair` is filled in.
+        """
+        cell, letter = pair
+        occupied = self.letters.get(cell)
+        return occupied is not None and occupied[0] == letter
+
+    def rewatch(self, pair):
+        """
+        Move the watches of the nogoods watching `pair`, which has just been
+        filled in, to other pairs of theirs that are not, if there are any.
+        """
+        for nogood in list(self.watches.get(pair, ())):
+            watched = self.nogoods[nogood]
+            other = watched[1] if watched[0] == pair else watched[0]
+            for candidate in nogood:
+                if candidate != other and not self.holds(candidate):
+                    self.nogoods[nogood] = (candidate, other)
+                    self.watches[pair].discard(nogood)
+                    self.watches.setdefault(candidate, set()).add(nogood)
+                    break
+
+    def remove(self, var, word):
+        """
+        Remove `word` as the value of `var` from the incremental search state.
+        """
+        if self.used.get(word) == var:
+            del self.used[word]
+        self.assigned -= 1
+        for k, cell in self.crossings[var]:
+            letter, count = self.letters[cell]
+            if count == 1:
+                del self.letters[cell]
+            else:
+                self.letters[cell] = (letter, count - 1)
+
+    def fits(self, var, word):
+        """
+        Return True if `word` can be added as the value of `var` to the
+        assignment described by the incremental search state, looking only at
+        the cells `var` shares with other variables; return False otherwise.
+        """
+        if len(word) != var.length or word in self.used:
+            return False
+        for k, cell in self.crossings[var]:
+            occupied = self.letters.get(cell)
+            if occupied is not None and occupied[0] != word[k]:
+                return False
+        return True
+
+    def refute(self, var, word, assignment):
+        """
+        Return None if `word` can be added as the value of `var` to
+        `assignment`; otherwise return the set of assigned variables that
+        rule it out, by using the word, crossing it with a different letter
+        or completing a learned nogood.
+        """
+        if self.fits(var, word):
+            return self.forbidden(var, word, assignment)
+
+        culprits = set()
+        if word in self.used:
+            culprits |= {self.used[word], DISTINCT}
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                if word[i] != assignment[neighbor][j]:
+                    culprits.add(neighbor)
+        return culprits
+
+    def forbidden(self, var, word, assignment):
+        """
+        Return None if adding `word` as the value of `var` to `assignment`
+        completes no learned nogood; otherwise return the set of assigned
+        variables that fill in the rest of the nogood.
+        """
+        own = {cell: word[k] for k, cell in self.crossings[var]}
+        for k, cell in self.crossings[var]:
+            for nogood in self.watches.get((cell, word[k]), ()):
+                if not all(
+                    own.get(other) == letter or self.holds((other, letter))
+                    for other, letter in (*self.nogoods[nogood], *nogood)
+                ):
+                    continue
+                self.nogoods.move_to_end(nogood)
+                self.stats["nogood hits"] += 1
+                return {
+                    next(v for v in self.covering[other] if v in assignment)
+                    for other, _ in nogood if other not in own
+                }
+        return None
+
+    def learn(self, culprits, assignment):
+        """
+        Record that no solution has the letters the variables in `culprits`
+        put in the cells they share, evicting the least recently used nogood
+        if there are too many.
+
+        A variable only prunes others through the letters in the cells they
+        share, so the pattern rules out every combination of words with those
+        letters, unless the conflict also depends on words being distinct.
+        """
+        if not culprits or not self.capacity or DISTINCT in culprits:
+            return
+        nogood = frozenset(
+            (cell, assignment[var][k])
+            for var in culprits
+            for k, cell in self.crossings[var]
+            if not all(other in culprits for other in self.covering[cell])
+        )
+        if not nogood:
+            return
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+
+        # Every pair is filled in now, so watch the two filled in last, which
+        # backjumping empties first
+        order = {var: i for i, var in enumerate(assignment)}
+        pairs = sorted(nogood, key=lambda pair: min(
+            order[var] for var in self.covering[pair[0]] if var in order
+        ))
+        watched = (pairs[-1], pairs[-2] if len(pairs) > 1 else pairs[-1])
+        self.nogoods[nogood] = watched
+        for pair in watched:
+            self.watches.setdefault(pair, set()).add(nogood)
+        self.stats["learned"] += 1
+
+        if len(self.nogoods) > self.capacity:
+            old, watched = self.nogoods.popitem(last=False)
+            for pair in watched:
+                self.watches[pair].discard(old)
+                if not self.watches[pair]:
+                    del self.watches[pair]
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -48,50 +408,252 @@ class CrosswordCreator():
         """
         Save crossword assignment to an image file.
         """
-        from PIL import Image, ImageDraw, ImageFont
-        cell_size = 100
-        cell_border = 2
-        interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
+        render(self.crossword, self.letter_grid(assignment), filename)
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
-        )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
-
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
+    def timed(self, phase, start):
+        """
+        Add the time since `start` to the time spent in `phase`, and report
+        the end of the phase to the callback.
+        """
+        self.stats["seconds"][phase] += time.perf_counter() - start
+        if self.callback is not None:
+            self.callback(phase, self.stats)
 
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
+    def prepare(self):
+        """
+        Enforce node and arc consistency, timing each.
+        Return False if a domain ends up empty; return True otherwise.
+        """
+        start = time.perf_counter()
+        self.enforce_node_consistency()
+        self.timed("node consistency", start)
 
-        img.save(filename)
+        start = time.perf_counter()
+        consistent = self.ac3()
+        self.timed("ac3", start)
+        return consistent
 
     def solve(self):
         """
         Enforce node and arc consistency, and then solve the CSP.
         """
-        self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        if not self.prepare():
+            return None
+
+        start = time.perf_counter()
+        try:
+            if self.restarts is None:
+                return self.backtrack(dict())
+
+            # Search again from the start with a growing node limit
+            mark = len(self.trail)
+            for i in itertools.count(1):
+                self.limit = self.stats["nodes"] + self.restarts * luby(i)
+                try:
+                    return self.backtrack(dict())
+                except Restart:
+                    self.undo(mark)
+                    self.stats["restarts"] += 1
+        finally:
+            self.timed("search", start)
+
+    def solutions(self, limit=None, timeout=None):
+        """
+        Yield complete assignments one at a time, stopping after `limit`
+        of them or once `timeout` seconds have passed, if given.
+
+        Independent blocks of variables are solved separately, and every
+        solution of one block is combined with every solution of the others.
+        With a seed, values are tried in random order for more varied fills.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self.prepare():
+            return
+        self.load(dict())
+
+        blocks = self.blocks(self.crossword.variables)
+        streams = [self.fills(block, deadline) for block in blocks]
+        seen = [[] for _ in blocks]
+
+        def combine(k):
+            """Yield every combination of solutions of blocks from `k` on."""
+            if k == len(blocks):
+                yield dict()
+                return
+
+            # Solutions of later blocks are kept to be combined again
+            i = 0
+            while True:
+                if i < len(seen[k]):
+                    part = seen[k][i]
+                else:
+                    part = next(streams[k], None)
+                    if part is None:
+                        return
+                    if k > 0:
+                        seen[k].append(part)
+                i += 1
+                for rest in combine(k + 1):
+                    yield {**part, **rest}
+
+        # Close the blocks last opened first, restoring the domains
+        try:
+            for number, assignment in enumerate(combine(0)):
+                if limit is not None and number >= limit:
+                    break
+                yield assignment
+        finally:
+            for stream in reversed(streams):
+                stream.close()
+
+    def count(self, timeout=None):
+        """
+        Return the number of complete assignments.
+
+        The unassigned variables are split into independent blocks, whose
+        counts are multiplied, after every assignment, and the count of each
+        block is cached by the domains of its variables. Raise TimeoutError
+        if counting takes more than `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self.prepare():
+            return 0
+        self.load(dict())
+        cache = dict()
+        start = time.perf_counter()
+        try:
+            return self.count_blocks(
+                frozenset(self.crossword.variables), cache, deadline
+            )
+        finally:
+            self.timed("search", start)
+
+    def blocks(self, variables):
+        """
+        Split `variables` into blocks that can be filled independently:
+        variables are in the same block if they cross, directly or through
+        other variables in `variables`, or if they have the same length, as
+        words must not repeat.
+        """
+        variables = set(variables)
+        blocks = []
+        while variables:
+            # Collect the variables crossing a variable, directly or not
+            start = variables.pop()
+            component = {start}
+            stack = [start]
+            while stack:
+                for neighbor in self.crossword.neighbors(stack.pop()):
+                    if neighbor in variables:
+                        variables.remove(neighbor)
+                        component.add(neighbor)
+                        stack.append(neighbor)
+
+            # Merge with the blocks using any of the same lengths
+            lengths = {var.length for var in component}
+            separate = []
+            for block, block_lengths in blocks:
+                if lengths & block_lengths:
+                    component |= block
+                    lengths |= block_lengths
+                else:
+                    separate.append((block, block_lengths))
+            blocks = separate + [(component, lengths)]
+        return [frozenset(block) for block, _ in blocks]
+
+    def fills(self, variables, deadline):
+        """
+        Yield every assignment to `variables` that extends the assignment in
+        the incremental search state, until `deadline` if it is not None.
+        """
+        assignment = self.assignment
+        unassigned = [var for var in variables if var not in assignment]
+        if not unassigned:
+            yield {var: assignment[var] for var in variables}
+            return
+
+        # Choose the variable with the fewest remaining values
+        var = min(
+            unassigned, key=lambda var: self.index.count(self.domains[var])
+        )
+        values = list(self.values(var))
+        if self.seed is not None:
+            self.random.shuffle(values)
+
+        for value in values:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            if not self.fits(var, value):
+                continue
+            assignment[var] = value
+            self.place(var, value)
+            mark = len(self.trail)
+            self.prune(var, self.index.bit(value), frozenset([var]))
+            try:
+                if self.infer(var, assignment):
+                    yield from self.fills(variables, deadline)
+            finally:
+                self.undo(mark)
+                self.remove(var, value)
+                del assignment[var]
+
+    def count_blocks(self, variables, cache, deadline):
+        """
+        Return the number of ways to extend the assignment in the incremental
+        search state to the unassigned `variables`.
+        """
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError("crossword count timed out")
+        if not variables:
+            return 1
+        blocks = self.blocks(variables)
+        if len(blocks) > 1:
+            return math.prod(
+                self.count_blocks(block, cache, deadline) for block in blocks
+            )
+
+        # Words already used are no longer available to the block
+        used = dict()
+        for word in self.used:
+            used[len(word)] = used.get(len(word), 0) | self.index.bit(word)
+        domains = {
+            var: self.domains[var] & ~used.get(var.length, 0)
+            for var in variables
+        }
+
+        # The count only depends on the remaining values of the block
+        key = frozenset(domains.items())
+        if key in cache:
+            return cache[key]
+
+        var = min(variables, key=lambda var: self.index.count(domains[var]))
+        total = 0
+        for value in self.index.members(var.length, domains[var]):
+            if not self.fits(var, value):
+                continue
+            self.assignment[var] = value
+            self.place(var, value)
+            mark = len(self.trail)
+            self.prune(var, self.index.bit(value), frozenset([var]))
+
+            # Arc consistency keeps the domains exact enough to share counts
+            arcs = [
+                (neighbor, var)
+                for neighbor in self.crossword.neighbors(var)
+                if neighbor not in self.assignment
+            ]
+            try:
+                if self.ac3(arcs):
+                    total += self.count_blocks(
+                        variables - {var}, cache, deadline
+                    )
+            finally:
+                self.undo(mark)
+                self.remove(var, value)
+                del self.assignment[var]
+
+        cache[key] = total
+        return total
 
     def enforce_node_consistency(self):
         """
@@ -101,11 +663,10 @@ class CrosswordCreator():
         """
 
         for var in self.crossword.variables:
-            for word in self.crossword.words:
-                # If the length of the word is not equal to the length of the variable
-                if len(word) != var.length:
-                    # Remove the word from the domain of the variable
-                    self.domains[var].remove(word)
+            # Keep only the words indexed under the length of the variable
+            domain = self.domains[var] & self.index.all(var.length)
+            if domain != self.domains[var]:
+                self.prune(var, domain)
 
     def revise(self, x, y):
         """
@@ -117,37 +678,44 @@ class CrosswordCreator():
         False if no revision was made.
         """
 
-        # Initialize a boolean variable to keep track of whether a revision was made
-        revised = False
-
-        # If there is an overlap between the variables
-        if self.crossword.overlaps[x, y] is not None:
-            # Get the overlap
-            i, j = self.crossword.overlaps[x, y]
-
-            # Loop over each word in the domain of `x`
-            for word_x in self.domains[x].copy():
-                # Initialize a boolean variable to keep track of whether there is a possible corresponding value
-                # for `y` in `self.domains[y]`
-                possible_corresponding_value = False
-
-                # Loop over each word in the domain of `y`
-                for word_y in self.domains[y]:
-                    # If the two words are not equal and the characters at the overlap are not equal
-                    if word_x != word_y and word_x[i] != word_y[j]:
-                        # Then there is a possible corresponding value for `y` in `self.domains[y]`
-                        possible_corresponding_value = True
-
-                # If there is no possible corresponding value for `y` in `self.domains[y]`
-                if not possible_corresponding_value:
-                    # Then remove the word from the domain of `x`
-                    self.domains[x].remove(word_x)
-
-                    # Mark that a revision was made
-                    revised = True
-
-        # Return whether a revision was made to the domain of `x`
-        return revised
+        self.stats["revisions"] += 1
+
+        # If there is no overlap between the variables, there is nothing to revise
+        if self.crossword.overlaps[x, y] is None:
+            return False
+        i, j = self.crossword.overlaps[x, y]
+
+        # Collect the words for `x` that have a letter `y` can take at the overlap
+        supported = 0
+        distinct = 0
+        same_length = x.length == y.length
+        for letter, bits in self.index.letters(y.length, j).items():
+            words_y = self.domains[y] & bits
+            if not words_y:
+                continue
+            words_x = self.index.matching(x.length, i, letter)
+
+            # A single word for `y` cannot also be the word for `x`
+            if same_length and self.index.count(words_y) == 1:
+                words_x &= ~words_y
+                distinct |= words_y
+            supported |= words_x
+
+        # Remove the words for `x` without a corresponding value for `y`
+        domain = self.domains[x] & supported
+        if domain == self.domains[x]:
+            return False
+
+        # The assignments that pruned `y` are to blame, and `y` if it is
+        # assigned, and distinct words if they pruned `x` under assignments
+        culprits = self.culprits[x] | self.culprits[y]
+        if y in self.assignment:
+            culprits |= {y}
+        if culprits and self.domains[x] & distinct:
+            culprits |= {DISTINCT}
+        self.prune(x, domain, culprits)
+        self.stats["revised"] += 1
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -161,34 +729,40 @@ class CrosswordCreator():
 
         # If arcs is None
         if arcs is None:
-            # Then initialize the queue of arcs
-            queue = list()
-
-            # Loop over each variable
-            for var in self.crossword.variables:
-                # Loop over each neighbor of the variable
-                for neighbor in self.crossword.neighbors(var):
-                    # Add the arc to the queue
-                    queue.append((var, neighbor))
-
+            # Then initialize the queue with every arc in the problem
+            queue = deque(
+                (var, neighbor)
+                for var in self.crossword.variables
+                for neighbor in self.crossword.neighbors(var)
+            )
         else:
             # Initialize the queue of arcs
-            queue = arcs
+            queue = deque(arcs)
+
+        # Keep track of the arcs in the queue, so that none is added twice
+        queued = set(queue)
 
         while queue:
             # Get the first arc in the queue
-            x, y = queue.pop(0)
+            arc = queue.popleft()
+            self.stats["arcs"] += 1
+            queued.discard(arc)
+            x, y = arc
 
             # If the arc is revised
             if self.revise(x, y):
                 # If the domain of `x` is empty, then return False
                 if not self.domains[x]:
+                    self.wipeout = x
+                    self.stats["wipeouts"] += 1
                     return False
 
                 # Loop over each neighbor of `x` that is not `y`
-                for neighbor in self.crossword.neighbors(x) - {y}:
-                    # Add the arc to the queue
-                    queue.append((neighbor, x))
+                for neighbor in self.crossword.neighbors(x):
+                    if neighbor != y and (neighbor, x) not in queued:
+                        # Add the arc to the queue
+                        queue.append((neighbor, x))
+                        queued.add((neighbor, x))
 
         return True
 
@@ -216,6 +790,10 @@ class CrosswordCreator():
         puzzle without conflicting characters); return False otherwise.
         """
 
+        # If a word is used twice, then the assignment is not consistent
+        if len(set(assignment.values())) != len(assignment):
+            return False
+
         # Loop over each variable in the assignment
         for var in assignment:
             # If the length of the word is not equal to the length of the variable, then the assignment is
@@ -247,30 +825,38 @@ class CrosswordCreator():
         that rules out the fewest values among the neighbors of `var`.
         """
 
-        # Initialize a dictionary to keep track of the number of values ruled out for neighboring variables
-        ruled_out = dict()
-
-        # Loop over each value in the domain of `var`
-        for value in self.domains[var]:
-            # Initialize a counter to keep track of the number of values ruled out for neighboring variables
-            ruled_out[value] = 0
-
-            # Loop over each neighbor of `var`
-            for neighbor in self.crossword.neighbors(var):
-                # If the neighbor is not in the assignment
-                if neighbor not in assignment:
-                    i, j = self.crossword.overlaps[var, neighbor]
-
-                    # Loop over each value in the domain of `neighbor`
-                    for neighbor_value in self.domains[neighbor]:
-                        # If the characters at the overlap are not equal
-                        if value[i] != neighbor_value[j]:
-                            # Then increment the counter
-                            ruled_out[value] += 1
+        values = list(self.values(var))
+
+        # Shuffle values first so that sorting breaks ties at random
+        if self.seed is not None:
+            self.random.shuffle(values)
+        if self.ordering is None:
+            return values
+
+        # In sampled mode, only order a random sample of a large domain
+        rest = []
+        if self.ordering == "sampled" and len(values) > self.sample:
+            chosen = set(self.random.sample(range(len(values)), self.sample))
+            rest = [value for k, value in enumerate(values) if k not in chosen]
+            values = [values[k] for k in sorted(chosen)]
+
+        # Collect the histogram of each unassigned neighbor at its overlap with `var`
+        lookups = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor not in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                lookups.append((i, self.histograms[neighbor][j]))
+
+        # A value rules out every neighbor value with a different letter at the overlap,
+        # so the fewest values are ruled out by the values keeping the most neighbor values
+        kept = {
+            value: sum(counts.get(value[i], 0) for i, counts in lookups)
+            for value in values
+        }
 
         # Return the values in the domain of `var` in order by the number of values they rule out
         # for neighboring variables
-        return sorted(self.domains[var], key=lambda value: ruled_out[value])
+        return sorted(values, key=lambda value: -kept[value]) + rest
 
     def select_unassigned_variable(self, assignment):
         """
@@ -289,7 +875,7 @@ class CrosswordCreator():
             # If the variable is not in the assignment
             if var not in assignment:
                 # Then add the variable to the dictionary
-                remaining_values[var] = len(self.domains[var])
+                remaining_values[var] = self.index.count(self.domains[var])
 
         # Get the variable with the minimum number of remaining values in its domain
         min_remaining_values = min(remaining_values.values())
@@ -339,9 +925,37 @@ class CrosswordCreator():
         if len(max_degree_vars) == 1:
             return max_degree_vars[0]
 
-        # Return any of the tied variables
+        # Return any of the tied variables, at random if there is a seed
+        if self.seed is not None:
+            return self.random.choice(max_degree_vars)
         return max_degree_vars[0]
 
+    def infer(self, var, assignment):
+        """
+        Prune the domains of unassigned neighbors of `var` once it has been
+        assigned, as chosen by `self.inference`.
+
+        Return False if a domain ends up empty; return True otherwise.
+        """
+        arcs = [
+            (neighbor, var)
+            for neighbor in self.crossword.neighbors(var)
+            if neighbor not in assignment
+        ]
+
+        # Maintain arc consistency from the neighbors outwards
+        if self.inference == "mac":
+            return self.ac3(arcs)
+
+        # Only check the neighbors against the new value
+        if self.inference == "forward":
+            for x, y in arcs:
+                if self.revise(x, y) and not self.domains[x]:
+                    self.wipeout = x
+                    self.stats["wipeouts"] += 1
+                    return False
+        return True
+
     def backtrack(self, assignment):
         """
         Using Backtracking Search, take as input a partial assignment for the
@@ -351,32 +965,82 @@ class CrosswordCreator():
 
         If no assignment is possible, return None.
         """
+        self.load(assignment)
+        result = self.search(assignment)
+        return result if isinstance(result, dict) else None
+
+    def search(self, assignment):
+        """
+        Extend `assignment` to a complete assignment, keeping the incremental
+        search state in step with it.
 
-        # If the assignment is complete, then return it
-        if self.assignment_complete(assignment):
+        Return the complete assignment if possible. Otherwise return the set
+        of assigned variables to blame, so that search jumps back to the
+        latest of them, skipping the choices in between.
+        """
+
+        # If every variable is assigned, then return the assignment
+        if self.assigned == len(self.crossword.variables):
             return assignment
 
+        # Give up on this search once it reaches the node limit
+        self.stats["nodes"] += 1
+        if self.limit is not None and self.stats["nodes"] > self.limit:
+            raise Restart
+        if (self.callback is not None and
+                self.stats["nodes"] % self.PROGRESS_INTERVAL == 0):
+            self.callback("progress", self.stats)
+
         # Get an unassigned variable
         var = self.select_unassigned_variable(assignment)
 
+        # Keep track of the assigned variables that rule out the values of `var`
+        conflicts = set(self.culprits[var])
+
         # Loop over each value in the domain of the variable
         for value in self.order_domain_values(var, assignment):
+            # If the value is not consistent with the assignment, then blame the
+            # variables that rule it out and skip it
+            culprits = self.refute(var, value, assignment)
+            if culprits is not None:
+                conflicts |= culprits
+                continue
+
             # Add the value to the assignment
             assignment[var] = value
+            self.place(var, value)
 
-            # If the value is consistent with the assignment
-            if self.consistent(assignment):
-                # Recursively call backtrack
-                result = self.backtrack(assignment)
+            # Narrow the domain of the variable to the value, and prune its neighbors
+            mark = len(self.trail)
+            self.prune(var, self.index.bit(value), frozenset([var]))
+            if self.infer(var, assignment):
+                # Recursively search
+                result = self.search(assignment)
 
-                # If the result is not None, then return it
-                if result is not None:
+                # If the result is an assignment, then return it
+                if isinstance(result, dict):
                     return result
+                culprits = result
+            else:
+                culprits = self.culprits[self.wipeout]
+
+            # Restore the domains pruned for this value
+            self.undo(mark)
 
             # Remove the value from the assignment
+            self.remove(var, value)
             del assignment[var]
+            self.stats["backtracks"] += 1
 
-        return None
+            # If `var` is not to blame, then no other value for it can help
+            if var not in culprits:
+                self.stats["backjumps"] += 1
+                return culprits
+            conflicts |= culprits - {var}
+
+        # The variables to blame leave no value for `var`
+        self.learn(conflicts, assignment)
+        return conflicts
 
 
 def main():
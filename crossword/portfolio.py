@@ -0,0 +1,120 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+from crossword import *
+from generate import CrosswordCreator
+
+# Solver configurations tried side by side; seeded ones break ties at random
+CONFIGS = [
+    {"inference": "mac", "ordering": "lcv"},
+    {"inference": "mac", "ordering": "lcv", "seed": 1, "restarts": 100},
+    {"inference": "forward", "ordering": "lcv", "seed": 2, "restarts": 100},
+    {"inference": "mac", "ordering": "sampled", "seed": 3, "restarts": 50},
+    {"inference": "mac", "ordering": None, "seed": 4, "restarts": 200},
+    {"inference": "forward", "ordering": "sampled", "seed": 5},
+    {"inference": "mac", "ordering": "lcv", "seed": 6, "restarts": 20},
+    {"inference": "mac", "ordering": None, "seed": 7}
+]
+
+# Crossword shared by every configuration a worker runs
+shared = dict()
+
+
+def initialize(crossword):
+    """Keeps the crossword loaded by the parent when a worker starts."""
+    shared["crossword"] = crossword
+
+
+def run(number):
+    """
+    Solves the shared crossword with configuration `number` and returns
+    the number, the assignment (None if there is none), the stats and the
+    error the configuration failed with, if any.
+    """
+    try:
+        creator = CrosswordCreator(shared["crossword"], **CONFIGS[number])
+        assignment = creator.solve()
+        return number, assignment, creator.stats, None
+    except Exception as e:
+        return number, None, None, repr(e)
+
+
+def solve(structure, words, configs=None, workers=None):
+    """
+    Solves a crossword with several configurations across a pool of
+    `workers` processes, and stops every worker once any configuration
+    finishes. Configurations that fail are skipped. Returns the assignment,
+    None if there is no solution, and stats naming the configuration that
+    won and the errors of any that failed before it.
+    """
+    if configs is None:
+        configs = range(len(CONFIGS))
+    configs = list(configs)
+    if not configs:
+        raise ValueError("no configurations to run")
+    if workers is None:
+        workers = min(len(configs), os.cpu_count() or 1)
+
+    # Load the crossword in the parent, where a bad file fails only once
+    start = time.perf_counter()
+    crossword = Crossword(structure, words)
+
+    # Leaving the pool terminates any workers still running
+    errors = dict()
+    with multiprocessing.Pool(
+        workers, initializer=initialize, initargs=(crossword,)
+    ) as pool:
+        for number, assignment, stats, error in pool.imap_unordered(
+            run, configs
+        ):
+            if error is None:
+                break
+            errors[number] = error
+        else:
+            raise RuntimeError(f"every configuration failed: {errors}")
+
+    return assignment, {
+        "winner": number,
+        "config": CONFIGS[number],
+        "seconds": time.perf_counter() - start,
+        "solver": stats,
+        "errors": errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a crossword with a portfolio of solvers."
+    )
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--configs", type=int, nargs="+",
+                        help="numbers of the configurations to run")
+    args = parser.parse_args()
+
+    assignment, stats = solve(
+        args.structure, args.words, args.configs, args.workers
+    )
+    for number, error in sorted(stats["errors"].items()):
+        print(f"Configuration {number} failed: {error}")
+    print(f"Configuration {stats['winner']} finished first "
+          f"in {stats['seconds']:.3f}s: {stats['config']}")
+    print(f"Nodes: {stats['solver']['nodes']}, "
+          f"restarts: {stats['solver']['restarts']}")
+
+    # Print result
+    creator = CrosswordCreator(Crossword(args.structure, args.words))
+    if assignment is None:
+        print("No solution.")
+    else:
+        creator.print(assignment)
+        if args.output:
+            creator.save(assignment, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Size of each cell and its border, in pixels
+CELL_SIZE = 100
+CELL_BORDER = 2
+INTERIOR_SIZE = CELL_SIZE - 2 * CELL_BORDER
+
+FONT = "assets/fonts/OpenSans-Regular.ttf"
+FONT_SIZE = 80
+
+# Rasterized cells by font, size and letter, kept for the whole process
+glyphs = dict()
+
+
+def glyph(letter, font=FONT, size=FONT_SIZE):
+    """
+    Return the image of a white cell interior with `letter` drawn in it,
+    or a blank one if `letter` is None, rasterizing it only the first time.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    key = (font, size, letter)
+    if key in glyphs:
+        return glyphs[key]
+
+    # Include the far edge, as rectangles drawn on the canvas used to
+    image = Image.new("RGBA", (INTERIOR_SIZE + 1, INTERIOR_SIZE + 1), "white")
+    if letter:
+        face = ImageFont.truetype(font, size)
+        draw = ImageDraw.Draw(image)
+        if hasattr(draw, "textbbox"):
+            _, _, w, h = draw.textbbox((0, 0), letter, font=face)
+        else:
+            w, h = draw.textsize(letter, font=face)
+        draw.text(
+            ((INTERIOR_SIZE - w) / 2, (INTERIOR_SIZE - h) / 2 - 10),
+            letter, fill="black", font=face
+        )
+    glyphs[key] = image
+    return image
+
+
+def render(crossword, letters, filename, font=FONT, size=FONT_SIZE):
+    """
+    Save a crossword with the 2D array `letters` filled in to an image
+    file, pasting a cached image of each cell onto a black canvas.
+    """
+    from PIL import Image
+
+    img = Image.new(
+        "RGBA",
+        (crossword.width * CELL_SIZE, crossword.height * CELL_SIZE),
+        "black"
+    )
+    for i in range(crossword.height):
+        for j in range(crossword.width):
+            if crossword.structure[i][j]:
+                img.paste(
+                    glyph(letters[i][j], font, size),
+                    (j * CELL_SIZE + CELL_BORDER, i * CELL_SIZE + CELL_BORDER)
+                )
+    img.save(filename)
@@ -0,0 +1,100 @@
+import itertools
+import random
+
+import pytest
+
+from crossword import *
+from generate import CrosswordCreator
+
+CONFIGS = [
+    dict(),
+    dict(inference="forward"),
+    dict(inference=None),
+    dict(inference=None, nogoods=2),
+    dict(ordering="sampled", sample=2, seed=1),
+    dict(inference=None, seed=2, restarts=2),
+]
+
+
+def random_crossword(directory, seed):
+    """
+    Write a small random structure and vocabulary to `directory`, and
+    return the crossword made from them.
+    """
+    rng = random.Random(seed)
+    height, width = rng.randint(2, 4), rng.randint(2, 4)
+    structure = [
+        "".join("_" if rng.random() < 0.75 else "#" for _ in range(width))
+        for _ in range(height)
+    ]
+    letters = "ABCD"[:rng.randint(2, 4)]
+    words = {
+        "".join(rng.choice(letters) for _ in range(rng.randint(2, 4)))
+        for _ in range(rng.randint(5, 30))
+    }
+    structure_file = directory / f"structure{seed}.txt"
+    words_file = directory / f"words{seed}.txt"
+    structure_file.write_text("\n".join(structure) + "\n")
+    words_file.write_text("\n".join(sorted(words)) + "\n")
+    return Crossword(str(structure_file), str(words_file))
+
+
+def brute_force(crossword):
+    """
+    Return every complete assignment of distinct words that agree on the
+    letter in each cell, by trying every combination of words.
+    """
+    variables = sorted(crossword.variables, key=repr)
+    candidates = [
+        [word for word in crossword.words if len(word) == var.length]
+        for var in variables
+    ]
+    solutions = []
+    for words in itertools.product(*candidates):
+        if len(set(words)) < len(words):
+            continue
+        letters = dict()
+        if all(
+            letters.setdefault(cell, word[k]) == word[k]
+            for var, word in zip(variables, words)
+            for k, cell in enumerate(var.cells)
+        ):
+            solutions.append(dict(zip(variables, words)))
+    return solutions
+
+
+def key(assignment):
+    """Return a hashable form of `assignment` to compare solutions by."""
+    return tuple(sorted((repr(var), word) for var, word in assignment.items()))
+
+
+@pytest.fixture(params=range(40))
+def case(request, tmp_path):
+    crossword = random_crossword(tmp_path, request.param)
+    if len(crossword.variables) > 6:
+        pytest.skip("too many variables to brute force")
+    return crossword, brute_force(crossword)
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=repr)
+def test_solve(case, config):
+    crossword, solutions = case
+    assignment = CrosswordCreator(crossword, **config).solve()
+    if not solutions:
+        assert assignment is None
+    else:
+        assert key(assignment) in set(map(key, solutions))
+
+
+def test_solutions(case):
+    crossword, solutions = case
+    found = list(CrosswordCreator(crossword).solutions())
+    assert sorted(map(key, found)) == sorted(map(key, solutions))
+
+    limited = list(CrosswordCreator(crossword, seed=0).solutions(limit=2))
+    assert len(limited) == min(2, len(solutions))
+
+
+def test_count(case):
+    crossword, solutions = case
+    assert CrosswordCreator(crossword).count() == len(solutions)
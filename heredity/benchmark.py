@@ -0,0 +1,152 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+from heredity import PROBS, compute_probabilities
+from session import HereditySession, inheritance
+
+# Inference modes that can be benchmarked, by name
+MODES = {
+    "enumeration": compute_probabilities,
+    "session": lambda people: HereditySession(people).probabilities()
+}
+
+
+def generate_pedigree(generations, branching, evidence, seed=0):
+    """
+    Generate a synthetic pedigree in the format returned by `load_data`.
+
+    The first generation is a single couple of founders. Every couple has
+    `branching` children, and every child outside the last generation
+    marries a new founder. Genes and traits are sampled from `PROBS`, and
+    each person's trait is revealed as evidence with probability `evidence`.
+    """
+    rng = random.Random(seed)
+    people = dict()
+    genes = dict()
+
+    def add(mother=None, father=None):
+        """
+        Add a new person with the given parents and return their name.
+        """
+        name = f"P{len(people)}"
+        people[name] = {
+            "name": name,
+            "mother": mother,
+            "father": father,
+            "trait": None
+        }
+
+        # Sample the number of copies of the gene the person has
+        if mother is None:
+            weights = [PROBS["gene"][g] for g in (0, 1, 2)]
+            genes[name] = rng.choices((0, 1, 2), weights)[0]
+        else:
+            genes[name] = sum(
+                rng.random() < inheritance(genes[parent])
+                for parent in (mother, father)
+            )
+
+        # Reveal whether the person has the trait
+        if rng.random() < evidence:
+            people[name]["trait"] = (
+                rng.random() < PROBS["trait"][genes[name]][True]
+            )
+        return name
+
+    couples = [(add(), add())]
+    for generation in range(1, generations):
+        children = [
+            add(mother, father)
+            for mother, father in couples
+            for _ in range(branching)
+        ]
+        if generation < generations - 1:
+            couples = [(child, add()) for child in children]
+    return people
+
+
+def max_error(probabilities, reference):
+    """
+    Return the largest absolute difference between two sets of marginals.
+    """
+    return max(
+        abs(probabilities[person][field][value] -
+            reference[person][field][value])
+        for person in reference
+        for field in reference[person]
+        for value in reference[person][field]
+    )
+
+
+def measure(mode, people):
+    """
+    Run inference `mode` on `people` and return its marginals,
+    wall time in seconds and peak memory in bytes.
+    """
+    start = time.perf_counter()
+    probabilities = MODES[mode](people)
+    elapsed = time.perf_counter() - start
+
+    # Measure memory in a separate run, as tracing slows execution down
+    tracemalloc.start()
+    MODES[mode](people)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return probabilities, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark heredity inference on synthetic pedigrees."
+    )
+    parser.add_argument("--generations", type=int, nargs="+",
+                        default=[1, 2, 3, 4])
+    parser.add_argument("--branching", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--evidence", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES),
+                        default=list(MODES))
+    parser.add_argument("--max-enumeration", type=int, default=8,
+                        help="largest pedigree to run enumeration on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    columns = ("gens", "branch", "evidence", "people", "mode",
+               "reference", "time (s)", "peak (KiB)", "max error")
+    row = "{:>5} {:>6} {:>8} {:>6} {:>12} {:>12} {:>10} {:>10} {:>10}"
+    print(row.format(*columns))
+
+    for generations in args.generations:
+        for branching in args.branching:
+            for evidence in args.evidence:
+                people = generate_pedigree(
+                    generations, branching, evidence, args.seed
+                )
+
+                # Enumeration is exact but only feasible for small families
+                results = dict()
+                for mode in args.modes:
+                    if (mode == "enumeration" and
+                            len(people) > args.max_enumeration):
+                        continue
+                    results[mode] = measure(mode, people)
+                if "enumeration" in results:
+                    reference = "enumeration"
+                    exact = results["enumeration"][0]
+                else:
+                    reference = "session"
+                    exact = (results["session"][0] if "session" in results
+                             else MODES["session"](people))
+
+                for mode, (probabilities, elapsed, peak) in results.items():
+                    print(row.format(
+                        generations, branching, evidence, len(people), mode,
+                        reference, f"{elapsed:.4f}", f"{peak / 1024:.1f}",
+                        f"{max_error(probabilities, exact):.2e}"
+                    ))
+
+
+if __name__ == "__main__":
+    main()
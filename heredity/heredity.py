@@ -43,6 +43,24 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    probabilities = compute_probabilities(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def compute_probabilities(people):
+    """
+    Compute every person's gene and trait distribution by enumerating all
+    joint assignments consistent with the trait evidence in `people`.
+    """
+
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -82,14 +100,7 @@ def main():
     # Ensure probabilities sum to 1
     normalize(probabilities)
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -154,10 +165,10 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         # If person has parents
         else:
             # Get the number of genes of mother and father
-            mother_genes = 1 - PROBS["mutation"] if "mother" in two_genes \
-                else 0.5 if "mother" in one_gene else PROBS["mutation"]
-            father_genes = 1 - PROBS["mutation"] if "father" in two_genes \
-                else 0.5 if "father" in one_gene else PROBS["mutation"]
+            mother_genes = 1 - PROBS["mutation"] if mother in two_genes \
+                else 0.5 if mother in one_gene else PROBS["mutation"]
+            father_genes = 1 - PROBS["mutation"] if father in two_genes \
+                else 0.5 if father in one_gene else PROBS["mutation"]
 
             # The probability of person having a gene is the probability of person getting the gene from
             # mother and father
@@ -0,0 +1,340 @@
+import itertools
+import sys
+import time
+
+from heredity import PROBS, load_data, compute_probabilities
+
+# Possible number of copies of the gene for every person
+GENES = (0, 1, 2)
+
+
+def inheritance(genes):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes one copy of the gene on to their child.
+    """
+    if genes == 2:
+        return 1 - PROBS["mutation"]
+    if genes == 1:
+        return 0.5
+    return PROBS["mutation"]
+
+
+class Factor():
+    """
+    Table mapping every assignment of gene counts to `variables`
+    (a tuple of person names) to a non-negative number.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    @classmethod
+    def unit(cls, variables):
+        """
+        Return a factor over `variables` that is 1 everywhere.
+        """
+        return cls(variables, dict.fromkeys(
+            itertools.product(GENES, repeat=len(variables)), 1
+        ))
+
+    def multiply(self, other):
+        """
+        Return the pointwise product of this factor and `other`.
+        """
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        left = [variables.index(v) for v in self.variables]
+        right = [variables.index(v) for v in other.variables]
+
+        table = dict()
+        for values in itertools.product(GENES, repeat=len(variables)):
+            table[values] = (
+                self.table[tuple(values[i] for i in left)] *
+                other.table[tuple(values[i] for i in right)]
+            )
+        return Factor(variables, table)
+
+    def marginalize(self, variables):
+        """
+        Return this factor with every variable not in `variables` summed out.
+        """
+        keep = tuple(v for v in self.variables if v in variables)
+        indices = [self.variables.index(v) for v in keep]
+
+        table = dict.fromkeys(itertools.product(GENES, repeat=len(keep)), 0)
+        for values, p in self.table.items():
+            table[tuple(values[i] for i in indices)] += p
+        return Factor(keep, table)
+
+
+class HereditySession():
+    """
+    Compiled pedigree that answers gene and trait queries under changing
+    trait evidence.
+
+    The pedigree is compiled once into a junction tree with one clique per
+    person. Messages between cliques are cached, and changing the evidence
+    for one person only discards the messages flowing out of that person's
+    clique, so later queries recompute just the affected part of the tree.
+    """
+
+    def __init__(self, people):
+        self.people = people
+        self.evidence = {person: people[person]["trait"] for person in people}
+
+        # Keep track of how much work the session has done
+        self.stats = {
+            "messages computed": 0,
+            "messages invalidated": 0
+        }
+
+        # Connect every person with their parents, and parents with each other
+        graph = {person: set() for person in people}
+        for person in people:
+            family = [person] + [
+                parent for parent in (people[person]["mother"],
+                                      people[person]["father"])
+                if parent is not None
+            ]
+            for a, b in itertools.permutations(family, 2):
+                graph[a].add(b)
+
+        # Eliminate people one at a time, preferring the fewest fill-in edges
+        order = []
+        cliques = dict()
+        remaining = {person: set(graph[person]) for person in graph}
+        while remaining:
+            person = min(remaining, key=lambda p: (
+                self.fill_in(remaining, p), len(remaining[p]), p
+            ))
+            neighbors = remaining.pop(person)
+            for neighbor in neighbors:
+                remaining[neighbor] |= neighbors - {neighbor}
+                remaining[neighbor].discard(person)
+            cliques[person] = neighbors | {person}
+            order.append(person)
+        position = {person: i for i, person in enumerate(order)}
+
+        # Link each clique to the clique of its earliest eliminated neighbor
+        self.cliques = {
+            person: tuple(sorted(cliques[person], key=position.get))
+            for person in order
+        }
+        self.neighbors = {person: set() for person in order}
+        self.separators = dict()
+        for person in order:
+            separator = cliques[person] - {person}
+            if separator:
+                parent = min(separator, key=position.get)
+                self.neighbors[person].add(parent)
+                self.neighbors[parent].add(person)
+                self.separators[person, parent] = separator
+                self.separators[parent, person] = separator
+
+        # Multiply each person's gene distribution into the first clique that
+        # contains the person and both of their parents
+        self.priors = {
+            person: Factor.unit(self.cliques[person]) for person in order
+        }
+        for person in people:
+            family = [person] + [
+                parent for parent in (people[person]["mother"],
+                                      people[person]["father"])
+                if parent is not None
+            ]
+            clique = min(family, key=position.get)
+            self.priors[clique] = self.priors[clique].multiply(
+                self.gene_factor(person)
+            )
+
+        # Evidence about a person's trait lives in that person's own clique
+        self.potentials = dict()
+        for person in order:
+            self.potentials[person] = self.potential(person)
+        self.messages = dict()
+
+    @staticmethod
+    def fill_in(graph, person):
+        """
+        Return the number of edges eliminating `person` would add to `graph`.
+        """
+        return sum(
+            1 for a, b in itertools.combinations(graph[person], 2)
+            if b not in graph[a]
+        )
+
+    def gene_factor(self, person):
+        """
+        Return the factor for the number of copies of the gene `person` has,
+        given the number of copies their parents have.
+        """
+        mother = self.people[person]["mother"]
+        father = self.people[person]["father"]
+
+        # People without parents follow the unconditional distribution
+        if mother is None and father is None:
+            return Factor((person,), {
+                (genes,): PROBS["gene"][genes] for genes in GENES
+            })
+
+        table = dict()
+        for genes, mother_genes, father_genes in itertools.product(
+            GENES, repeat=3
+        ):
+            from_mother = inheritance(mother_genes)
+            from_father = inheritance(father_genes)
+            if genes == 2:
+                p = from_mother * from_father
+            elif genes == 1:
+                p = (from_mother * (1 - from_father) +
+                     from_father * (1 - from_mother))
+            else:
+                p = (1 - from_mother) * (1 - from_father)
+            table[genes, mother_genes, father_genes] = p
+        return Factor((person, mother, father), table)
+
+    def potential(self, person):
+        """
+        Return the potential of `person`'s clique under the current evidence.
+        """
+        trait = self.evidence[person]
+        if trait is None:
+            return self.priors[person]
+        return self.priors[person].multiply(Factor((person,), {
+            (genes,): PROBS["trait"][genes][trait] for genes in GENES
+        }))
+
+    def set_evidence(self, person, trait):
+        """
+        Record whether `person` is known to have the trait, or `None` if
+        unknown, and invalidate every cached message that depends on it.
+        """
+        if person not in self.evidence:
+            raise KeyError(f"unknown person {person}")
+        if trait is not None:
+            trait = bool(trait)
+        if self.evidence[person] == trait:
+            return
+        self.evidence[person] = trait
+        self.potentials[person] = self.potential(person)
+
+        # Discard the messages directed away from the changed clique
+        stack = [(person, neighbor) for neighbor in self.neighbors[person]]
+        while stack:
+            source, target = stack.pop()
+            if self.messages.pop((source, target), None) is not None:
+                self.stats["messages invalidated"] += 1
+            stack.extend(
+                (target, neighbor) for neighbor in self.neighbors[target]
+                if neighbor != source
+            )
+
+    def clear_evidence(self, person):
+        """
+        Forget any evidence about whether `person` has the trait.
+        """
+        self.set_evidence(person, None)
+
+    def message(self, source, target):
+        """
+        Return the message from clique `source` to clique `target`,
+        computing it and any messages it depends on if not cached.
+        """
+        stack = [(source, target)]
+        while stack:
+            i, j = stack[-1]
+            if (i, j) in self.messages:
+                stack.pop()
+                continue
+
+            # Compute incoming messages first
+            missing = [
+                (k, i) for k in self.neighbors[i]
+                if k != j and (k, i) not in self.messages
+            ]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            stack.pop()
+            factor = self.potentials[i]
+            for k in self.neighbors[i]:
+                if k != j:
+                    factor = factor.multiply(self.messages[k, i])
+            self.messages[i, j] = factor.marginalize(self.separators[i, j])
+            self.stats["messages computed"] += 1
+
+        return self.messages[source, target]
+
+    def marginal(self, person):
+        """
+        Return `person`'s gene and trait distributions under the current
+        evidence, in the same format as `compute_probabilities`.
+        """
+        belief = self.potentials[person]
+        for neighbor in self.neighbors[person]:
+            belief = belief.multiply(self.message(neighbor, person))
+        belief = belief.marginalize((person,))
+
+        total = sum(belief.table.values())
+        gene = {genes: belief.table[genes,] / total for genes in (2, 1, 0)}
+
+        # Known traits are certain; unknown ones follow from the gene
+        trait = self.evidence[person]
+        if trait is not None:
+            has_trait = 1 if trait else 0
+        else:
+            has_trait = sum(
+                gene[genes] * PROBS["trait"][genes][True] for genes in GENES
+            )
+        return {
+            "gene": gene,
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+
+    def probabilities(self):
+        """
+        Return the gene and trait distributions for every person.
+        """
+        return {person: self.marginal(person) for person in self.people}
+
+
+def main():
+    # Check for proper usage
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python session.py data.csv")
+    people = load_data(sys.argv[1])
+
+    # Time a cold run of the full enumeration
+    start = time.perf_counter()
+    compute_probabilities(people)
+    cold = time.perf_counter() - start
+    print(f"Cold enumeration: {cold:.6f}s")
+
+    # Time compiling the session and answering the first query
+    start = time.perf_counter()
+    session = HereditySession(people)
+    session.probabilities()
+    print(f"Session compile and first query: "
+          f"{time.perf_counter() - start:.6f}s")
+
+    # Toggle each person's evidence and re-query
+    for person in people:
+        previous = session.evidence[person]
+        session.set_evidence(person, not previous)
+        start = time.perf_counter()
+        session.probabilities()
+        warm = time.perf_counter() - start
+        print(f"Re-query with {person} trait = {not previous}: "
+              f"{warm:.6f}s ({cold / warm:.1f}x faster than cold)")
+        session.set_evidence(person, previous)
+
+    print(f"Messages computed: {session.stats['messages computed']}")
+    print(f"Messages invalidated: {session.stats['messages invalidated']}")
+
+
+if __name__ == "__main__":
+    main()
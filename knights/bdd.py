@@ -0,0 +1,345 @@
+from logic import *
+
+
+def order(sentences):
+    """
+    Returns the names of the symbols in `sentences` in the order they are
+    first met by a depth-first walk, which keeps symbols that appear
+    together in a subsentence close together in the diagram.
+    """
+    names = []
+    seen = set()
+    visited = set()
+    stack = list(reversed(sentences))
+    while stack:
+        node = stack.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        if isinstance(node, Symbol):
+            if node.name not in seen:
+                seen.add(node.name)
+                names.append(node.name)
+        else:
+            stack.extend(reversed(node.operands()))
+    return names
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams over a fixed order of symbols.
+
+    Every node is an integer: 0 and 1 are the false and true terminals, and
+    any other node tests the symbol at its level, continuing to its low
+    child if the symbol is false and its high child if true. All diagrams
+    share one unique table, so equivalent sentences compile to the same
+    node, and one cache of operation results.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+        # Terminals sit below every symbol
+        self.levels = [len(self.names), len(self.names)]
+        self.lows = [None, None]
+        self.highs = [None, None]
+        self.unique = dict()
+        self.cache = dict()
+        self.compiled = dict()
+
+        # Keep track of how often work is shared
+        self.stats = {
+            "unique hits": 0,
+            "cache hits": 0,
+            "cache misses": 0
+        }
+
+    def node(self, level, low, high):
+        """Returns the node testing `level`, reusing an equal node if any."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is not None:
+            self.stats["unique hits"] += 1
+            return node
+        node = len(self.levels)
+        self.levels.append(level)
+        self.lows.append(low)
+        self.highs.append(high)
+        self.unique[key] = node
+        return node
+
+    def variable(self, name):
+        """Returns the node that is true exactly when symbol `name` is."""
+        if name not in self.positions:
+            raise Exception(f"variable {name} not in order")
+        return self.node(self.positions[name], self.FALSE, self.TRUE)
+
+    def negate(self, a):
+        """Returns the node for the negation of `a`."""
+        if a <= self.TRUE:
+            return self.TRUE - a
+
+        # Negate children before their parents
+        stack = [(a, False)]
+        while stack:
+            node, expanded = stack.pop()
+            key = ("not", node)
+            if not expanded:
+                if key in self.cache:
+                    self.stats["cache hits"] += 1
+                    continue
+                stack.append((node, True))
+                for child in (self.lows[node], self.highs[node]):
+                    if child <= self.TRUE:
+                        continue
+                    if ("not", child) in self.cache:
+                        self.stats["cache hits"] += 1
+                    else:
+                        stack.append((child, False))
+                continue
+
+            self.stats["cache misses"] += 1
+            low, high = (
+                self.TRUE - child if child <= self.TRUE
+                else self.cache["not", child]
+                for child in (self.lows[node], self.highs[node])
+            )
+            self.cache[key] = self.node(self.levels[node], low, high)
+        return self.cache["not", a]
+
+    def decide(self, op, a, b):
+        """
+        Returns the node for `a` and `b` combined by `op` if that is decided
+        without splitting either diagram, otherwise None.
+        """
+        if op == "and":
+            if a == self.FALSE or b == self.FALSE:
+                return self.FALSE
+            if a == self.TRUE or a == b:
+                return b
+            if b == self.TRUE:
+                return a
+        elif op == "or":
+            if a == self.TRUE or b == self.TRUE:
+                return self.TRUE
+            if a == self.FALSE or a == b:
+                return b
+            if b == self.FALSE:
+                return a
+        else:
+            if a == b:
+                return self.FALSE
+            if a == self.FALSE:
+                return b
+            if b == self.FALSE:
+                return a
+            if a == self.TRUE:
+                return self.negate(b)
+            if b == self.TRUE:
+                return self.negate(a)
+        return None
+
+    def apply(self, op, a, b):
+        """Returns the node for `a` and `b` combined by "and", "or" or "xor"."""
+        result = self.decide(op, a, b)
+        if result is not None:
+            return result
+        if a > b:
+            a, b = b, a
+
+        # Combine children before their parents, pushing each parent back
+        # under them with the split it is waiting on
+        cache = self.cache
+        levels, lows, highs = self.levels, self.lows, self.highs
+        hits = misses = 0
+        stack = [(a, b, None)]
+        while stack:
+            x, y, split = stack.pop()
+            if split is not None:
+                misses += 1
+                level, low, high, low_pair, high_pair = split
+                if low is None:
+                    low = cache[(op, *low_pair)]
+                if high is None:
+                    high = cache[(op, *high_pair)]
+                cache[op, x, y] = self.node(level, low, high)
+                continue
+            if (op, x, y) in cache:
+                hits += 1
+                continue
+
+            # Split both diagrams on the topmost symbol either of them tests
+            level = min(levels[x], levels[y])
+            x_low, x_high = (
+                (lows[x], highs[x]) if levels[x] == level else (x, x)
+            )
+            y_low, y_high = (
+                (lows[y], highs[y]) if levels[y] == level else (y, y)
+            )
+            low_pair = (x_low, y_low) if x_low < y_low else (y_low, x_low)
+            high_pair = (x_high, y_high) if x_high < y_high \
+                else (y_high, x_high)
+
+            # Only pairs with a terminal or twice the same node are decided
+            low = high = None
+            if low_pair[0] <= self.TRUE or x_low == y_low:
+                low = self.decide(op, *low_pair)
+            if high_pair[0] <= self.TRUE or x_high == y_high:
+                high = self.decide(op, *high_pair)
+            stack.append((x, y, (level, low, high, low_pair, high_pair)))
+            for pair, child in ((low_pair, low), (high_pair, high)):
+                if child is not None:
+                    continue
+                if (op, *pair) in cache:
+                    hits += 1
+                else:
+                    stack.append((*pair, None))
+
+        self.stats["cache hits"] += hits
+        self.stats["cache misses"] += misses
+        return cache[op, a, b]
+
+    def deepest_first(self, nodes):
+        """
+        Returns `nodes` ordered from the one whose top symbol is deepest, so
+        that the diagram being built up stays below the nodes added to it.
+        """
+        return sorted(nodes, key=lambda node: -self.levels[node])
+
+    def compile(self, sentence):
+        """Returns the node for `sentence`."""
+        stack = [sentence]
+        while stack:
+            node = stack[-1]
+            if node in self.compiled:
+                stack.pop()
+                continue
+            pending = [
+                operand for operand in node.operands()
+                if operand not in self.compiled
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+
+            operands = [self.compiled[operand] for operand in node.operands()]
+            if isinstance(node, Symbol):
+                result = self.variable(node.name)
+            elif isinstance(node, Not):
+                result = self.negate(operands[0])
+            elif isinstance(node, And):
+                result = self.TRUE
+                for operand in self.deepest_first(operands):
+                    result = self.apply("and", result, operand)
+            elif isinstance(node, Or):
+                result = self.FALSE
+                for operand in self.deepest_first(operands):
+                    result = self.apply("or", result, operand)
+            elif isinstance(node, Implication):
+                result = self.apply(
+                    "or", self.negate(operands[0]), operands[1]
+                )
+            elif isinstance(node, Biconditional):
+                result = self.negate(
+                    self.apply("xor", operands[0], operands[1])
+                )
+            else:
+                raise TypeError(f"cannot compile {node!r}")
+            self.compiled[node] = result
+
+        return self.compiled[sentence]
+
+    def entails(self, a, b):
+        """Checks if every assignment satisfying `a` satisfies `b`."""
+        return self.apply("and", a, self.negate(b)) == self.FALSE
+
+    def count(self, a):
+        """Returns the number of assignments to all symbols satisfying `a`."""
+        counts = {self.FALSE: 0, self.TRUE: 1}
+
+        def below(node, level):
+            """Counts assignments to the symbols from `level` down."""
+            return counts[node] << (self.levels[node] - level)
+
+        # Count children before their parents
+        stack = [a]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            pending = [
+                child for child in (self.lows[node], self.highs[node])
+                if child not in counts
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            level = self.levels[node] + 1
+            counts[node] = (below(self.lows[node], level) +
+                            below(self.highs[node], level))
+
+        return below(a, 0)
+
+    def models(self, a):
+        """Yields every assignment to all symbols satisfying `a`."""
+        model = dict()
+
+        # Walk depth first, each entry setting the symbol above its level
+        stack = [(a, 0, None)] if a != self.FALSE else []
+        while stack:
+            node, level, value = stack.pop()
+            if level > 0:
+                model[self.names[level - 1]] = value
+            if level == len(self.names):
+                yield dict(model)
+                continue
+            tests = self.levels[node] == level
+            for value, child in ((True, self.highs[node] if tests else node),
+                                 (False, self.lows[node] if tests else node)):
+                if child != self.FALSE:
+                    stack.append((child, level + 1, value))
+
+    def statistics(self):
+        """Returns the sizes of the tables and how often work was shared."""
+        return {
+            "nodes": len(self.levels),
+            "unique table": len(self.unique),
+            "cache entries": len(self.cache),
+            **self.stats
+        }
+
+
+def entails(knowledge, query, stats=None):
+    """Checks if knowledge base entails query by comparing their diagrams."""
+    bdd = BDD(order([knowledge, query]))
+    entailed = bdd.entails(bdd.compile(knowledge), bdd.compile(query))
+    if stats is not None:
+        stats.update(bdd.statistics())
+        stats["explored"] = stats["nodes"]
+    return entailed
+
+
+def entails_all(knowledge, queries, stats=None):
+    """Checks which queries knowledge base entails, compiling it only once."""
+    bdd = BDD(order([knowledge] + list(queries)))
+    kb = bdd.compile(knowledge)
+    entailed = [bdd.entails(kb, bdd.compile(query)) for query in queries]
+    if stats is not None:
+        stats.update(bdd.statistics())
+        stats["explored"] = stats["nodes"]
+    return entailed
+
+
+def count_models(sentence):
+    """Returns the number of assignments to its symbols satisfying sentence."""
+    bdd = BDD(order([sentence]))
+    return bdd.count(bdd.compile(sentence))
@@ -0,0 +1,235 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import time
+import tracemalloc
+
+from logic import *
+
+# Clauses per symbol at which random 3-CNF is hardest to decide
+PHASE_TRANSITION = 4.26
+
+
+def random_kcnf(n, k=3, ratio=PHASE_TRANSITION, seed=0):
+    """
+    Generate a random k-CNF knowledge base over `n` symbols with
+    round(`ratio` * n) clauses, each over k distinct symbols with random
+    signs. Returns the knowledge base and the query Or(), which it entails
+    exactly when it is unsatisfiable.
+    """
+    rng = random.Random(seed)
+    symbols = [Symbol(f"x{i}") for i in range(n)]
+    clauses = []
+    for _ in range(round(ratio * n)):
+        clauses.append(Or(*[
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in rng.sample(symbols, k)
+        ]))
+    return And(*clauses), Or()
+
+
+def random_puzzle(inhabitants, seed=0):
+    """
+    Generate a knights and knaves puzzle with `inhabitants` characters,
+    each of whom says one random statement about the others.
+
+    Roles are drawn at random first, and a statement is negated whenever
+    its speaker's role would make it a lie they cannot tell, so the puzzle
+    always has that assignment as a solution. Returns the knowledge base
+    and the query that the first character is their true role.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"C{i} is a Knight") for i in range(inhabitants)]
+    knaves = [Symbol(f"C{i} is a Knave") for i in range(inhabitants)]
+    roles = [rng.random() < 0.5 for _ in range(inhabitants)]
+    model = dict()
+    for i, knight in enumerate(roles):
+        model[knights[i].name] = knight
+        model[knaves[i].name] = not knight
+
+    def claim(i):
+        """Returns the sentence that character `i` is a knight or a knave."""
+        return knights[i] if rng.random() < 0.5 else knaves[i]
+
+    sentences = []
+    for i in range(inhabitants):
+        sentences.append(Or(knights[i], knaves[i]))
+        sentences.append(Not(And(knights[i], knaves[i])))
+
+    for i in range(inhabitants):
+        others = [j for j in range(inhabitants) if j != i] or [i]
+        kind = rng.randrange(3)
+        if kind == 0:
+            statement = claim(rng.choice(others))
+        elif kind == 1:
+            a, b = rng.choice(others), rng.choice(others)
+            statement = And(claim(a), claim(b))
+        else:
+            a, b = rng.choice(others), rng.choice(others)
+            statement = Biconditional(knights[a], knights[b])
+        if statement.evaluate(model) != roles[i]:
+            statement = Not(statement)
+        sentences.append(Biconditional(knights[i], statement))
+
+    query = knights[0] if roles[0] else knaves[0]
+    return And(*sentences), query
+
+
+def run(backend, knowledge, query, connection):
+    """
+    Check entailment with `backend` in a child process and send back the
+    verdict, wall time in seconds, the backend's statistics and, once a
+    second run finishes, peak memory in bytes. Memory is traced in this
+    process only, so for the parallel backend it leaves out its workers.
+    """
+
+    # Lead a process group of our own, for any workers to be stopped with us
+    os.setpgrp()
+    try:
+        stats = dict()
+        start = time.perf_counter()
+        entailed = model_check(knowledge, query, backend=backend, stats=stats)
+        elapsed = time.perf_counter() - start
+        connection.send(("ok", entailed, elapsed, stats))
+
+        # Measure memory in a separate run, as tracing slows execution down
+        tracemalloc.start()
+        model_check(knowledge, query, backend=backend)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        connection.send(("memory", peak))
+    except Exception as e:
+        connection.send(("error", repr(e)))
+    finally:
+        connection.close()
+
+
+def measure(backend, knowledge, query, timeout):
+    """
+    Benchmark one backend on one instance, giving up after `timeout`
+    seconds. Returns a dict with its status ("ok", "timeout" or "error"),
+    verdict, time, models explored and peak memory of the child process.
+    """
+    result = {
+        "backend": backend,
+        "status": "timeout",
+        "entailed": None,
+        "seconds": None,
+        "explored": None,
+        "peak_bytes": None
+    }
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+
+    # Not a daemon, since the parallel backend starts processes of its own
+    process = multiprocessing.Process(
+        target=run, args=(backend, knowledge, query, sender)
+    )
+    process.start()
+    sender.close()
+
+    deadline = time.monotonic() + timeout
+    try:
+        while receiver.poll(max(0, deadline - time.monotonic())):
+            message = receiver.recv()
+            if message[0] == "ok":
+                _, entailed, elapsed, stats = message
+                result.update(status="ok", entailed=entailed, seconds=elapsed,
+                              explored=stats.get("explored"), stats=stats)
+            elif message[0] == "memory":
+                result["peak_bytes"] = message[1]
+                break
+            else:
+                result.update(status="error", error=message[1])
+                break
+    except EOFError:
+        if result["status"] == "timeout":
+            result["status"] = "error"
+
+    # Stop the child and any workers it started, with any memory run still
+    # going; before the child leads its own group it has no workers yet
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            process.terminate()
+    process.join()
+    receiver.close()
+    return result
+
+
+def instances(args):
+    """Yields (name, kind, knowledge base, query) for every instance."""
+    for n in args.sizes:
+        for i in range(args.repeat):
+            seed = args.seed + i
+            knowledge, query = random_kcnf(n, args.k, args.ratio, seed)
+            yield f"cnf-{args.k}-{n}-{seed}", "k-cnf", knowledge, query
+    for n in args.inhabitants:
+        for i in range(args.repeat):
+            seed = args.seed + i
+            knowledge, query = random_puzzle(n, seed)
+            yield f"puzzle-{n}-{seed}", "puzzle", knowledge, query
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark entailment backends on random instances."
+    )
+    parser.add_argument("--sizes", type=int, nargs="*", default=[8, 12, 16],
+                        help="symbols in each random k-CNF instance")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ratio", type=float, default=PHASE_TRANSITION,
+                        help="clauses per symbol")
+    parser.add_argument("--inhabitants", type=int, nargs="*",
+                        default=[3, 6, 9])
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="instances of each size, with successive seeds")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS),
+                        default=list(BACKENDS))
+    parser.add_argument("--timeout", type=float, default=10,
+                        help="seconds before a backend is stopped")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json",
+                        help="file to write results to as JSON")
+    args = parser.parse_args()
+
+    columns = ("instance", "symbols", "backend", "status", "entailed",
+               "time (s)", "explored", "peak (KiB)")
+    row = "{:>16} {:>7} {:>12} {:>8} {:>8} {:>9} {:>10} {:>10}"
+    print(row.format(*columns))
+
+    records = []
+    for name, kind, knowledge, query in instances(args):
+        symbols = len(set.union(knowledge.symbols(), query.symbols()))
+        results = []
+        for backend in args.backends:
+            result = measure(backend, knowledge, query, args.timeout)
+            result.update(instance=name, kind=kind, symbols=symbols)
+            results.append(result)
+            print(row.format(
+                name, symbols, backend, result["status"],
+                str(result["entailed"]),
+                "" if result["seconds"] is None else f"{result['seconds']:.4f}",
+                "" if result["explored"] is None else result["explored"],
+                ("" if result["peak_bytes"] is None
+                 else f"{result['peak_bytes'] / 1024:.1f}")
+            ))
+
+        # Every backend that finished must agree
+        verdicts = {r["entailed"] for r in results if r["status"] == "ok"}
+        if len(verdicts) > 1:
+            print(f"{name}: backends disagree")
+        for result in results:
+            result["agrees"] = len(verdicts) <= 1
+        records.extend(results)
+
+    with open(args.output, "w") as f:
+        json.dump({"arguments": vars(args), "results": records}, f, indent=2)
+    print(f"Wrote {len(records)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
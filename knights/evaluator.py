@@ -0,0 +1,223 @@
+import functools
+import itertools
+
+from logic import *
+
+# Deepest expression generated inline; deeper operands are kept in locals
+MAX_DEPTH = 80
+
+# Instructions of the postfix code
+LOAD, CONST, NOT, AND, OR, IMPLIES, IFF, STORE, FETCH = range(9)
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Returns a function that evaluates `sentence` on a sequence of booleans,
+    where the value of each symbol is at its name's position in `symbols`.
+    Compiled functions are cached per sentence and symbol order.
+    """
+    return _compile(sentence, tuple(symbols))
+
+
+def shared(sentence):
+    """
+    Returns the subsentences other than symbols that appear as an operand
+    more than once in `sentence`, and so are worth computing only once.
+    """
+    uses = dict()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        for operand in node.operands():
+            uses[operand] = uses.get(operand, 0) + 1
+            if uses[operand] == 1:
+                stack.append(operand)
+    return {
+        node for node, count in uses.items()
+        if count > 1 and not isinstance(node, Symbol)
+    }
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(sentence, symbols):
+    """Compiles `sentence` for `compile_sentence`, uncached."""
+    index = {name: i for i, name in enumerate(symbols)}
+    reused = shared(sentence)
+
+    # Generate an expression for every node, operands first, and assign
+    # shared or deep ones to locals so that each is written out only once
+    sources = dict()
+    depths = dict()
+    lines = []
+    stack = [sentence]
+    while stack:
+        node = stack[-1]
+        if node in sources:
+            stack.pop()
+            continue
+        pending = [
+            operand for operand in node.operands() if operand not in sources
+        ]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+
+        operands = [sources[operand] for operand in node.operands()]
+        depth = 1 + max(
+            (depths[operand] for operand in node.operands()), default=0
+        )
+        if isinstance(node, Symbol):
+            if node.name not in index:
+                raise Exception(f"variable {node.name} not in model")
+            source = f"v[{index[node.name]}]"
+        elif isinstance(node, Not):
+            source = f"(not {operands[0]})"
+        elif isinstance(node, And):
+            source = f"({' and '.join(operands)})" if operands else "True"
+        elif isinstance(node, Or):
+            source = f"({' or '.join(operands)})" if operands else "False"
+        elif isinstance(node, Implication):
+            source = f"(not {operands[0]} or {operands[1]})"
+        elif isinstance(node, Biconditional):
+            source = f"({operands[0]} == {operands[1]})"
+        else:
+            raise TypeError(f"cannot compile {node!r}")
+
+        if node is not sentence and (node in reused or depth >= MAX_DEPTH):
+            local = f"t{len(lines)}"
+            lines.append(f"    {local} = {source}")
+            source, depth = local, 0
+        sources[node] = source
+        depths[node] = depth
+
+    lines.append(f"    return {sources[sentence]}")
+    try:
+        namespace = dict()
+        exec("def evaluate(v):\n" + "\n".join(lines), namespace)
+        return namespace["evaluate"]
+    except (RecursionError, SyntaxError, MemoryError):
+        return functools.partial(run, postfix(sentence, index))
+
+
+def postfix(sentence, index):
+    """
+    Returns postfix code for `sentence` as a list of instructions. Shared
+    subsentences are stored once computed and fetched again when reused.
+    """
+    reused = shared(sentence)
+    slots = dict()
+    code = []
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded and node in slots:
+            code.append((FETCH, slots[node]))
+            continue
+        operands = node.operands()
+        if not expanded and operands:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in reversed(operands))
+            continue
+
+        if isinstance(node, Symbol):
+            if node.name not in index:
+                raise Exception(f"variable {node.name} not in model")
+            code.append((LOAD, index[node.name]))
+        elif isinstance(node, Not):
+            code.append((NOT, 1))
+        elif isinstance(node, (And, Or)) and not operands:
+            code.append((CONST, isinstance(node, And)))
+        elif isinstance(node, And):
+            code.append((AND, len(operands)))
+        elif isinstance(node, Or):
+            code.append((OR, len(operands)))
+        elif isinstance(node, Implication):
+            code.append((IMPLIES, 2))
+        elif isinstance(node, Biconditional):
+            code.append((IFF, 2))
+        else:
+            raise TypeError(f"cannot compile {node!r}")
+
+        if node in reused:
+            slots[node] = len(slots)
+            code.append((STORE, slots[node]))
+    return code
+
+
+def run(code, values):
+    """Runs postfix `code` on a sequence of booleans."""
+    stack = []
+    saved = dict()
+    push = stack.append
+    for op, arg in code:
+        if op == LOAD:
+            push(values[arg])
+        elif op == FETCH:
+            push(saved[arg])
+        elif op == STORE:
+            saved[arg] = stack[-1]
+        elif op == NOT:
+            stack[-1] = not stack[-1]
+        elif op == CONST:
+            push(arg)
+        elif op == AND:
+            result = all(stack[-arg:])
+            del stack[-arg:]
+            push(result)
+        elif op == OR:
+            result = any(stack[-arg:])
+            del stack[-arg:]
+            push(result)
+        elif op == IMPLIES:
+            b = stack.pop()
+            stack[-1] = not stack[-1] or b
+        else:
+            b = stack.pop()
+            stack[-1] = stack[-1] == b
+    return stack[0]
+
+
+def entails(knowledge, query, stats=None):
+    """Checks if knowledge base entails query by enumerating compiled models."""
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    kb = compile_sentence(knowledge, symbols)
+    q = compile_sentence(query, symbols)
+
+    entailed = True
+    explored = 0
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        explored += 1
+        if kb(values) and not q(values):
+            entailed = False
+            break
+
+    if stats is not None:
+        stats["explored"] = explored
+    return entailed
+
+
+def entails_all(knowledge, queries, stats=None):
+    """Checks which queries knowledge base entails in one enumeration."""
+    symbols = sorted(set.union(
+        knowledge.symbols(), *[query.symbols() for query in queries]
+    ))
+    kb = compile_sentence(knowledge, symbols)
+    compiled = [compile_sentence(query, symbols) for query in queries]
+
+    entailed = [True] * len(queries)
+    undecided = list(range(len(queries)))
+    explored = 0
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        if not undecided:
+            break
+        explored += 1
+        if kb(values):
+            for i in undecided:
+                if not compiled[i](values):
+                    entailed[i] = False
+            undecided = [i for i in undecided if entailed[i]]
+
+    if stats is not None:
+        stats["explored"] = explored
+    return entailed
@@ -1,19 +1,80 @@
+import importlib
 import itertools
+import weakref
 
 
 class Sentence():
 
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Every live sentence, keyed by its structure, so that structurally
+    # equal sentences are the same object
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, key, **fields):
+        """Returns the unique sentence with structure `key`."""
+        key = (cls,) + key
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            object.__setattr__(sentence, "_hash", hash(key))
+            object.__setattr__(sentence, "_symbols", None)
+            Sentence.interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), self.operands())
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned. Returns None if the value depends on those symbols.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        if self._symbols is None:
+
+            # Collect symbols from every distinct subsentence not yet cached
+            names = set()
+            seen = {id(self)}
+            stack = list(self.operands())
+            while stack:
+                node = stack.pop()
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                if node._symbols is not None:
+                    names.update(node._symbols)
+                else:
+                    stack.extend(node.operands())
+            object.__setattr__(self, "_symbols", frozenset(names))
+        return set(self._symbols)
+
+    def operands(self):
+        """Returns a tuple of the immediate subsentences of the sentence."""
+        return ()
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +105,16 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        symbol = cls.intern((name,), name=name)
+        if symbol._symbols is None:
+            object.__setattr__(symbol, "_symbols", frozenset((name,)))
+        return symbol
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (type(self), (self.name,))
 
     def __repr__(self):
         return self.name
@@ -62,23 +125,21 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern((operand,), operand=operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +147,25 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def operands(self):
+        return (self.operand,)
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    __slots__ = ("conjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def __new__(cls, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        return cls.intern(conjuncts, conjuncts=conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +174,41 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        """Returns the conjunction with `conjunct` added to the end."""
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def operands(self):
+        return self.conjuncts
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    __slots__ = ("disjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __new__(cls, *disjuncts):
+        for disjunct in disjuncts:
+            Sentence.validate(disjunct)
+        return cls.intern(disjuncts, disjuncts=disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +217,35 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def operands(self):
+        return self.disjuncts
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    __slots__ = ("antecedent", "consequent")
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __new__(cls, antecedent, consequent):
+        Sentence.validate(antecedent)
+        Sentence.validate(consequent)
+        return cls.intern((antecedent, consequent),
+                          antecedent=antecedent, consequent=consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +254,34 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def operands(self):
+        return (self.antecedent, self.consequent)
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+    __slots__ = ("left", "right")
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __new__(cls, left, right):
+        Sentence.validate(left)
+        Sentence.validate(right)
+        return cls.intern((left, right), left=left, right=right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +292,170 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+        left = Sentence.parenthesize(self.left.formula())
+        right = Sentence.parenthesize(self.right.formula())
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    def operands(self):
+        return (self.left, self.right)
+
+
+# Entailment backends, by name, mapped to the module implementing them
+BACKENDS = {
+    "enumerate": None,
+    "sat": "sat",
+    "compiled": "evaluator",
+    "truth-table": "truthtable",
+    "parallel": "parallel",
+    "bdd": "bdd"
+}
+
+
+def load_backend(backend):
+    """Returns the module implementing an entailment backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}")
+    return importlib.import_module(BACKENDS[backend])
+
+
+def model_check(knowledge, query, backend="enumerate", simplify=False,
+                **options):
+    """
+    Checks if knowledge base entails query.
+    If `simplify` is set, both are simplified before checking.
+    Any `options` are passed on to the chosen backend; every backend takes
+    a `stats` dictionary to fill with counters, including how many models
+    or search nodes it "explored".
+    """
+
+    if simplify:
+        knowledge, (query,) = importlib.import_module("simplify").prepare(
+            knowledge, [query]
+        )
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    # Hand off to another backend if requested
+    if backend != "enumerate":
+        return load_backend(backend).entails(knowledge, query, **options)
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = list(set.union(knowledge.symbols(), query.symbols()))
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(knowledge, [query], symbols, dict(), **options)[0]
+
+
+def check_all(knowledge, queries, symbols, model, stats=None):
+    """
+    Checks which queries knowledge base entails in every completion of a
+    partial `model` over `symbols`. Returns a list of booleans.
+
+    Assignments are made to `model` in place and undone from a trail when
+    backtracking; `model` is restored before returning. A subtree is skipped
+    as soon as knowledge base is false in it or every undecided query is
+    true in it, and a query is refuted as soon as knowledge base is true
+    and the query false, whatever the remaining symbols are. If `stats` is
+    given, the number of partial models visited is added to "explored".
+    """
+    entailed = [True] * len(queries)
+    undecided = list(range(len(queries)))
+    unassigned = [symbol for symbol in symbols if symbol not in model]
+    trail = []
+    explored = 0
+
+    while undecided:
+        descend = False
+        explored += 1
+
+        # Evaluate knowledge base and queries under the partial model
+        kb = knowledge.evaluate_partial(model)
+        if kb is not False:
+            values = {i: queries[i].evaluate_partial(model) for i in undecided}
+            if kb is True:
+                for i in undecided:
+                    if values[i] is False:
+                        entailed[i] = False
+                undecided = [i for i in undecided if entailed[i]]
+            descend = any(values[i] is not True for i in undecided)
+
+        # Assign the next symbol, trying true first
+        if descend and len(trail) < len(unassigned):
+            symbol = unassigned[len(trail)]
+            model[symbol] = True
+            trail.append(symbol)
+            continue
+
+        # Undo symbols whose both values have been tried
+        while trail and model[trail[-1]] is False:
+            del model[trail.pop()]
+        if not trail:
+            break
+        model[trail[-1]] = False
+
+    # Restore the model
+    for symbol in trail:
+        del model[symbol]
+
+    if stats is not None:
+        stats["explored"] = stats.get("explored", 0) + explored
+    return entailed
+
+
+def model_check_all(knowledge, queries, backend="enumerate", simplify=False,
+                    **options):
+    """
+    Checks which of several queries knowledge base entails, finding the
+    models of the knowledge base only once. Returns a list of booleans.
+    Any `options`, such as `stats`, are passed on as for `model_check`.
+    """
+    queries = list(queries)
+    if simplify:
+        knowledge, queries = importlib.import_module("simplify").prepare(
+            knowledge, queries
+        )
+
+    # Hand off to another backend if requested
+    if backend != "enumerate":
+        module = load_backend(backend)
+        if hasattr(module, "entails_all"):
+            return module.entails_all(knowledge, queries, **options)
+
+        # Check queries one at a time, adding up what each explored
+        stats = options.pop("stats", None)
+        entailed = []
+        explored = 0
+        for query in queries:
+            counters = dict()
+            entailed.append(
+                module.entails(knowledge, query, stats=counters, **options)
+            )
+            explored += counters.get("explored", 0)
+        if stats is not None:
+            stats["explored"] = explored
+        return entailed
+
+    # Get all symbols in knowledge and every query
+    symbols = list(set.union(
+        knowledge.symbols(), *[query.symbols() for query in queries]
+    ))
+
+    # Check which queries knowledge entails
+    return check_all(knowledge, queries, symbols, dict(), **options)
+
+
+def backbone(knowledge, backend="enumerate", **options):
+    """Returns the names of the symbols true in every model of knowledge base."""
+    names = sorted(knowledge.symbols())
+    entailed = model_check_all(
+        knowledge, [Symbol(name) for name in names], backend, **options
+    )
+    return {name for name, true in zip(names, entailed) if true}
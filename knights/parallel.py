@@ -0,0 +1,68 @@
+import itertools
+import math
+import multiprocessing
+import os
+
+from logic import *
+
+# Units of work per worker, so that uneven units still balance out
+UNITS_PER_WORKER = 4
+
+# Knowledge base, query and symbol order shared by every unit in a worker
+shared = dict()
+
+
+def initialize(knowledge, query, symbols):
+    """Receives the problem once when a worker process starts."""
+    shared["knowledge"] = knowledge
+    shared["query"] = query
+    shared["symbols"] = symbols
+
+
+def check_unit(prefix):
+    """
+    Checks entailment in every model that starts with the assignment
+    `prefix` to the first symbols.
+    """
+    symbols = shared["symbols"]
+    model = dict(zip(symbols, prefix))
+    stats = dict()
+    entailed = check_all(
+        shared["knowledge"], [shared["query"]], symbols, model, stats
+    )[0]
+    return entailed, stats["explored"]
+
+
+def entails(knowledge, query, workers=None, split=None, stats=None):
+    """
+    Checks if knowledge base entails query by fixing the first `split`
+    symbols into 2^split units of work and enumerating them over a pool of
+    `workers` processes. Stops every worker at the first counter-model.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Sort symbols so that every run splits the problem the same way
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if split is None:
+        split = math.ceil(math.log2(workers * UNITS_PER_WORKER))
+    split = min(split, len(symbols))
+    units = itertools.product((True, False), repeat=split)
+
+    # Leaving the pool terminates any workers still running
+    entailed = True
+    explored = 0
+    with multiprocessing.Pool(
+        workers, initializer=initialize, initargs=(knowledge, query, symbols)
+    ) as pool:
+        for unit_entailed, unit_explored in pool.imap_unordered(
+            check_unit, units
+        ):
+            explored += unit_explored
+            if not unit_entailed:
+                entailed = False
+                break
+
+    if stats is not None:
+        stats["explored"] = explored
+    return entailed
@@ -0,0 +1,227 @@
+import array
+import marshal
+import os
+import re
+
+from logic import *
+
+# Operators, with ASCII aliases mapped to the symbols `formula` emits
+ALIASES = {
+    "¬": "¬", "~": "¬", "!": "¬",
+    "∧": "∧", "&": "∧", "/\\": "∧",
+    "∨": "∨", "|": "∨", "\\/": "∨",
+    "=>": "=>", "->": "=>",
+    "<=>": "<=>", "<->": "<=>",
+    "(": "(", ")": ")"
+}
+OPERATORS = re.compile(r"(<=>|<->|=>|->|/\\|\\/|[¬~!∧&∨|()])")
+
+# Binding power of each binary operator; higher binds tighter
+BINDING = {"<=>": 1, "=>": 2, "∨": 3, "∧": 4}
+
+# Version of the cache format, and instructions used to store sentences
+CACHE_VERSION = 1
+SYMBOL, NOT, AND, OR, IMPLIES, IFF = range(6)
+
+
+def tokenize(text):
+    """
+    Returns the tokens of `text`: operators in the form `formula` emits,
+    and symbol names as ("name", name) pairs. Anything between two
+    operators is a symbol name, so names may contain spaces.
+    """
+    tokens = []
+    for i, piece in enumerate(OPERATORS.split(text)):
+        if i % 2:
+            tokens.append(ALIASES[piece])
+        else:
+            name = piece.strip()
+            if name:
+                tokens.append(("name", name))
+    return tokens
+
+
+class Parser():
+    """
+    Pratt parser for a formula in the notation of `Sentence.formula`.
+    Chains of the same ∧ or ∨ operator become a single And or Or,
+    => is right associative, and <=> is left associative.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def advance(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("unexpected end of formula")
+        self.position += 1
+        return token
+
+    def parse(self):
+        """Returns the sentence the tokens describe."""
+        sentence = self.expression(0)
+        if self.peek() is not None:
+            raise ValueError(f"unexpected {self.peek()!r}")
+        return sentence
+
+    def primary(self):
+        """Parses a symbol, a negation or a parenthesized expression."""
+        token = self.advance()
+        if isinstance(token, tuple):
+            return Symbol(token[1])
+        if token == "¬":
+            return Not(self.primary())
+        if token == "(":
+            sentence = self.expression(0)
+            if self.advance() != ")":
+                raise ValueError("expected )")
+            return sentence
+        raise ValueError(f"unexpected {token!r}")
+
+    def expression(self, power):
+        """Parses operators that bind tighter than `power`."""
+        left = self.primary()
+        while True:
+            op = self.peek()
+            if op not in BINDING or BINDING[op] <= power:
+                return left
+            self.advance()
+
+            if op == "∧" or op == "∨":
+                operands = [left, self.expression(BINDING[op])]
+                while self.peek() == op:
+                    self.advance()
+                    operands.append(self.expression(BINDING[op]))
+                left = And(*operands) if op == "∧" else Or(*operands)
+            elif op == "=>":
+                left = Implication(left, self.expression(BINDING[op] - 1))
+            else:
+                left = Biconditional(left, self.expression(BINDING[op]))
+
+
+def parse(text):
+    """Returns the sentence written in `text`."""
+    return Parser(tokenize(text)).parse()
+
+
+def parse_file(filename):
+    """
+    Yields the sentence on each line of a file, one line at a time.
+    Blank lines and lines starting with # are skipped.
+    """
+    with open(filename, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                yield parse(line)
+            except ValueError as e:
+                raise ValueError(f"{filename}:{number}: {e}") from None
+
+
+def dump(sentences):
+    """
+    Returns bytes storing `sentences`: each distinct node once, operands
+    before the nodes that use them, referring to earlier nodes by index.
+    """
+    names = dict()
+    indices = dict()
+    code = array.array("q")
+
+    for sentence in sentences:
+        stack = [sentence]
+        while stack:
+            node = stack[-1]
+            if node in indices:
+                stack.pop()
+                continue
+            pending = [
+                operand for operand in node.operands()
+                if operand not in indices
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+
+            if isinstance(node, Symbol):
+                name = names.setdefault(node.name, len(names))
+                code.extend((SYMBOL, 1, name))
+            else:
+                op = (NOT if isinstance(node, Not) else
+                      AND if isinstance(node, And) else
+                      OR if isinstance(node, Or) else
+                      IMPLIES if isinstance(node, Implication) else IFF)
+                code.extend((op, len(node.operands())))
+                code.extend(indices[operand] for operand in node.operands())
+            indices[node] = len(indices)
+
+    roots = [indices[sentence] for sentence in sentences]
+    return marshal.dumps((list(names), code.tobytes(), roots))
+
+
+def load_dump(data):
+    """Returns the sentences stored in bytes from `dump`."""
+    names, raw, roots = marshal.loads(data)
+    code = array.array("q")
+    code.frombytes(raw)
+    constructors = {
+        NOT: Not, AND: And, OR: Or, IMPLIES: Implication, IFF: Biconditional
+    }
+
+    nodes = []
+    i = 0
+    while i < len(code):
+        op, count = code[i], code[i + 1]
+        arguments = code[i + 2:i + 2 + count]
+        if op == SYMBOL:
+            nodes.append(Symbol(names[arguments[0]]))
+        else:
+            nodes.append(constructors[op](*[nodes[k] for k in arguments]))
+        i += 2 + count
+    return [nodes[root] for root in roots]
+
+
+def load(filename, cache=True):
+    """
+    Returns the list of sentences in a file, one per line.
+
+    If `cache` is set, the parsed sentences are also saved next to the file
+    in binary form and read back from there while the file is unchanged.
+    """
+    if not cache:
+        return list(parse_file(filename))
+
+    # Only trust a cache made from this exact version of the file
+    status = os.stat(filename)
+    key = (CACHE_VERSION, status.st_size, status.st_mtime_ns)
+    cache_file = filename + ".kbcache"
+    try:
+        with open(cache_file, "rb") as f:
+            cached_key, data = marshal.loads(f.read())
+        if cached_key == key:
+            return load_dump(data)
+    except (OSError, EOFError, ValueError, TypeError, IndexError, KeyError):
+        pass
+
+    # Write to a temporary file first so no reader sees a partial cache
+    sentences = list(parse_file(filename))
+    temporary = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(marshal.dumps((key, dump(sentences))))
+        os.replace(temporary, cache_file)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+    return sentences
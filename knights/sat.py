@@ -0,0 +1,539 @@
+import heapq
+
+from logic import *
+
+
+class Encoder():
+    """
+    Tseitin conversion of logical sentences into clauses.
+
+    Every symbol and every compound subsentence is given an integer
+    variable; a negative integer is the negation of that variable. The
+    clauses defining each variable are collected in `clauses` until they
+    are taken with `flush`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.variables = dict()
+        self.names = dict()
+        self.literals = dict()
+        self.clauses = []
+        self.true = None
+
+    def new_variable(self):
+        """Returns a fresh variable."""
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable for the symbol called `name`."""
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+            self.names[self.variables[name]] = name
+        return self.variables[name]
+
+    def constant(self, value):
+        """Returns a literal that is always `value`."""
+        if self.true is None:
+            self.true = self.new_variable()
+            self.clauses.append([self.true])
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to `sentence`, defining it if new."""
+        stack = [sentence]
+        while stack:
+            node = stack[-1]
+            if node in self.literals:
+                stack.pop()
+                continue
+
+            # Define every subsentence before the sentence containing it
+            pending = [
+                operand for operand in node.operands()
+                if operand not in self.literals
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+
+            stack.pop()
+            self.literals[node] = self.define(node)
+
+        return self.literals[sentence]
+
+    def define(self, sentence):
+        """Returns a literal for `sentence`, whose operands are defined."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        operands = [self.literals[operand] for operand in sentence.operands()]
+
+        if isinstance(sentence, Not):
+            return -operands[0]
+
+        if isinstance(sentence, And):
+            if not operands:
+                return self.constant(True)
+            x = self.new_variable()
+            for operand in operands:
+                self.clauses.append([-x, operand])
+            self.clauses.append([x] + [-operand for operand in operands])
+            return x
+
+        if isinstance(sentence, Or):
+            if not operands:
+                return self.constant(False)
+            x = self.new_variable()
+            for operand in operands:
+                self.clauses.append([x, -operand])
+            self.clauses.append([-x] + operands)
+            return x
+
+        if isinstance(sentence, Implication):
+            a, b = operands
+            x = self.new_variable()
+            self.clauses.extend([[-x, -a, b], [x, a], [x, -b]])
+            return x
+
+        if isinstance(sentence, Biconditional):
+            a, b = operands
+            x = self.new_variable()
+            self.clauses.extend([
+                [-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]
+            ])
+            return x
+
+        raise TypeError(f"cannot encode {sentence!r}")
+
+    def flush(self):
+        """Returns the clauses added since the last flush."""
+        clauses = self.clauses
+        self.clauses = []
+        return clauses
+
+
+def luby(i):
+    """Returns the `i`th element (from 1) of the Luby restart sequence."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Solver():
+    """
+    Conflict-driven clause learning SAT solver.
+
+    Uses two watched literals per clause for unit propagation, first-UIP
+    clause learning with non-chronological backjumping, activity-based
+    branching with phase saving, and Luby restarts. Clauses may be added
+    between calls to `solve`, and each call may assume a list of literals.
+    """
+
+    RESTART_INTERVAL = 100
+    ACTIVITY_DECAY = 0.95
+
+    def __init__(self):
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activity = [0.0]
+        self.increment = 1.0
+        self.heap = []
+
+        self.clauses = []
+        self.watches = dict()
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.unsatisfiable = False
+        self.model = None
+
+        # Keep track of how much work the solver has done
+        self.stats = {
+            "decisions": 0,
+            "propagations": 0,
+            "conflicts": 0,
+            "learned": 0,
+            "restarts": 0
+        }
+
+    def ensure(self, var):
+        """Makes room for variables up to `var`."""
+        while len(self.values) <= var:
+            new = len(self.values)
+            self.values.append(None)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.phases.append(False)
+            self.activity.append(0.0)
+            self.watches[new] = []
+            self.watches[-new] = []
+            heapq.heappush(self.heap, (0.0, new))
+
+    def value(self, lit):
+        """Returns the value of `lit`, or None if it is unassigned."""
+        value = self.values[abs(lit)]
+        if value is None or lit > 0:
+            return value
+        return not value
+
+    def value_in_model(self, lit):
+        """Returns the value of `lit` in the last model found."""
+        value = self.model[abs(lit)]
+        return value if lit > 0 else not value
+
+    def level(self):
+        """Returns the current decision level."""
+        return len(self.limits)
+
+    def enqueue(self, lit, reason):
+        """Assigns `lit` true at the current level because of `reason`."""
+        var = abs(lit)
+        self.values[var] = lit > 0
+        self.levels[var] = self.level()
+        self.reasons[var] = reason
+        self.trail.append(lit)
+
+    def add_clause(self, clause):
+        """
+        Adds a clause, given as a list of literals, to the problem.
+        Returns False if the problem has become unsatisfiable.
+        """
+        if self.unsatisfiable:
+            return False
+        self.backjump(0)
+        for lit in clause:
+            self.ensure(abs(lit))
+
+        # Drop literals that are false at the top level
+        simplified = []
+        for lit in clause:
+            value = self.value(lit)
+            if value is True or -lit in simplified:
+                return True
+            if value is None and lit not in simplified:
+                simplified.append(lit)
+
+        if not simplified:
+            self.unsatisfiable = True
+        elif len(simplified) == 1:
+            self.enqueue(simplified[0], None)
+            if self.propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self.attach(simplified)
+        return not self.unsatisfiable
+
+    def attach(self, clause):
+        """Stores a clause and watches its first two literals."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses.
+        Returns the index of a conflicting clause, or None.
+        """
+        while self.head < len(self.trail):
+            false_lit = -self.trail[self.head]
+            self.head += 1
+            self.stats["propagations"] += 1
+
+            watchers = self.watches[false_lit]
+            kept = []
+            self.watches[false_lit] = kept
+            for n, index in enumerate(watchers):
+                clause = self.clauses[index]
+
+                # Keep the false literal in the second watched position
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.value(first) is True:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+
+                    # The clause is either conflicting or unit
+                    if self.value(first) is False:
+                        kept.extend(watchers[n + 1:])
+                        return index
+                    self.enqueue(first, index)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives a first-UIP clause from a conflict.
+        Returns the learned clause and the level to backjump to.
+        """
+        learned = []
+        seen = set()
+        counter = 0
+        lit = None
+        index = conflict
+        position = len(self.trail) - 1
+
+        while True:
+            clause = self.clauses[index]
+            for q in (clause if lit is None else clause[1:]):
+                var = abs(q)
+                if var not in seen and self.levels[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if self.levels[var] == self.level():
+                        counter += 1
+                    else:
+                        learned.append(q)
+
+            # Walk back to the next literal involved in the conflict
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            lit = self.trail[position]
+            position -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            index = self.reasons[abs(lit)]
+
+        learned.insert(0, -lit)
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal assigned at the highest remaining level
+        highest = max(range(1, len(learned)),
+                      key=lambda k: self.levels[abs(learned[k])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, var):
+        """Increases the activity of `var`."""
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [
+                (-self.activity[v], v) for v in range(1, len(self.values))
+                if self.values[v] is None
+            ]
+            heapq.heapify(self.heap)
+        elif self.values[var] is None:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backjump(self, level):
+        """Undoes every assignment made above decision `level`."""
+        if self.level() <= level:
+            return
+        for lit in self.trail[self.limits[level]:]:
+            var = abs(lit)
+            self.values[var] = None
+            self.reasons[var] = None
+            self.phases[var] = lit > 0
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def pick(self):
+        """Returns the most active unassigned variable, or None."""
+        while self.heap:
+            activity, var = heapq.heappop(self.heap)
+            if self.values[var] is None and -activity == self.activity[var]:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, storing a satisfying assignment in `model`.
+        """
+        self.model = None
+        if self.unsatisfiable:
+            return False
+        for lit in assumptions:
+            self.ensure(abs(lit))
+        self.backjump(0)
+
+        restarts = 1
+        budget = self.RESTART_INTERVAL * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                if self.level() == 0:
+                    self.unsatisfiable = True
+                    return False
+
+                # Learn from the conflict and jump back to where it applies
+                learned, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.enqueue(learned[0], self.attach(learned))
+                self.stats["learned"] += 1
+                self.increment /= self.ACTIVITY_DECAY
+
+                budget -= 1
+                if budget <= 0:
+                    self.stats["restarts"] += 1
+                    restarts += 1
+                    budget = self.RESTART_INTERVAL * luby(restarts)
+                    self.backjump(0)
+                continue
+
+            # Decide the assumptions before anything else
+            if self.level() < len(assumptions):
+                lit = assumptions[self.level()]
+                value = self.value(lit)
+                if value is False:
+                    self.backjump(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value is None:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.pick()
+            if var is None:
+                self.model = list(self.values)
+                self.backjump(0)
+                return True
+            self.stats["decisions"] += 1
+            self.limits.append(len(self.trail))
+            self.enqueue(var if self.phases[var] else -var, None)
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that grows one sentence at a time, keeping its encoder
+    and solver, including learned clauses, between entailment checks.
+
+    Sentences added after `push` are retracted by the matching `pop`. Each
+    scope has a selector variable that guards the clauses asserting its
+    sentences and is assumed true while the scope is open; popping a scope
+    asserts its selector false for good.
+    """
+
+    def __init__(self, *sentences):
+        self.encoder = Encoder()
+        self.solver = Solver()
+        self.selectors = []
+        self.scopes = [[]]
+        for sentence in sentences:
+            self.add(sentence)
+
+    def literal(self, sentence):
+        """Returns the literal for `sentence`, passing new clauses on."""
+        literal = self.encoder.literal(sentence)
+        self.solver.ensure(self.encoder.count)
+        for clause in self.encoder.flush():
+            self.solver.add_clause(clause)
+        return literal
+
+    def add(self, sentence):
+        """Adds `sentence` to the innermost open scope."""
+        Sentence.validate(sentence)
+        self.scopes[-1].append(sentence)
+
+        # Assert each conjunct on its own, so that it propagates directly
+        conjuncts = (
+            sentence.conjuncts if isinstance(sentence, And) else (sentence,)
+        )
+        for conjunct in conjuncts:
+            clause = [self.literal(conjunct)]
+            if self.selectors:
+                clause.append(-self.selectors[-1])
+            self.solver.add_clause(clause)
+
+    def push(self):
+        """Opens a scope for temporary sentences."""
+        selector = self.encoder.new_variable()
+        self.solver.ensure(selector)
+        self.selectors.append(selector)
+        self.scopes.append([])
+
+    def pop(self):
+        """Retracts every sentence added since the matching `push`."""
+        if not self.selectors:
+            raise Exception("no scope to pop")
+        self.scopes.pop()
+        self.solver.add_clause([-self.selectors.pop()])
+
+    def sentences(self):
+        """Returns every sentence currently in the knowledge base."""
+        return [sentence for scope in self.scopes for sentence in scope]
+
+    def satisfiable(self):
+        """Checks if the knowledge base has a model."""
+        return self.solver.solve(self.selectors)
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        literal = self.literal(query)
+        return not self.solver.solve(self.selectors + [-literal])
+
+    def entails_all(self, queries):
+        """
+        Checks which queries the knowledge base entails, refuting each by
+        assuming its negation. Every model found along the way refutes all
+        remaining queries it falsifies.
+        """
+        literals = [self.literal(query) for query in queries]
+        entailed = [True] * len(queries)
+        undecided = list(range(len(queries)))
+        assumption = []
+        while undecided:
+            if not self.solver.solve(self.selectors + assumption):
+                # Without assumptions, an unsatisfiable base entails anything
+                if not assumption:
+                    break
+                undecided.pop(0)
+            else:
+                for i in undecided:
+                    if self.solver.value_in_model(literals[i]) is False:
+                        entailed[i] = False
+                undecided = [i for i in undecided if entailed[i]]
+
+            # Try to refute the next undecided query
+            if undecided:
+                assumption = [-literals[undecided[0]]]
+        return entailed
+
+
+def entails(knowledge, query, stats=None):
+    """Checks if knowledge base entails query by refuting KB ∧ ¬query."""
+    kb = KnowledgeBase(knowledge)
+    entailed = kb.entails(query)
+    if stats is not None:
+        stats.update(kb.solver.stats)
+        stats["explored"] = kb.solver.stats["decisions"]
+    return entailed
+
+
+def entails_all(knowledge, queries, stats=None):
+    """Checks which queries knowledge base entails with one solver."""
+    kb = KnowledgeBase(knowledge)
+    entailed = kb.entails_all(queries)
+    if stats is not None:
+        stats.update(kb.solver.stats)
+        stats["explored"] = kb.solver.stats["decisions"]
+    return entailed
@@ -0,0 +1,331 @@
+import time
+
+from logic import *
+
+# Constants: an empty conjunction is always true, an empty disjunction false
+TRUE = And()
+FALSE = Or()
+
+# Most nodes simplified to split one side of a connective on a literal
+SPLIT_LIMIT = 256
+
+
+def size(sentence):
+    """Returns the number of nodes in `sentence`, counting shared ones again."""
+    sizes = dict()
+    stack = [sentence]
+    while stack:
+        node = stack[-1]
+        if node in sizes:
+            stack.pop()
+            continue
+        pending = [
+            operand for operand in node.operands() if operand not in sizes
+        ]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        sizes[node] = 1 + sum(sizes[operand] for operand in node.operands())
+    return sizes[sentence]
+
+
+def negate(sentence):
+    """Returns the simplified negation of `sentence`."""
+    if sentence is TRUE:
+        return FALSE
+    if sentence is FALSE:
+        return TRUE
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence)
+
+
+def literal(sentence):
+    """Returns (name, value) if `sentence` is a literal, otherwise None."""
+    if isinstance(sentence, Symbol):
+        return sentence.name, True
+    if isinstance(sentence, Not) and isinstance(sentence.operand, Symbol):
+        return sentence.operand.name, False
+    return None
+
+
+def cofactor(sentence, literal, value, cache):
+    """
+    Returns `sentence` simplified with `literal` (name, value) set, or None
+    if that takes more than SPLIT_LIMIT new nodes. Results are kept in
+    `cache` by (node, name, value) for every split of the pass to share.
+    Cofactors only fold constants and never split again, as nested splits
+    grow exponentially with the depth of the sentence.
+    """
+    name, positive = literal
+    value = positive == value
+    if name not in sentence.symbols():
+        return sentence
+
+    known = {name: value}
+    budget = SPLIT_LIMIT
+    stack = [sentence]
+    while stack:
+        node = stack[-1]
+        if (node, name, value) in cache:
+            stack.pop()
+            continue
+        pending = [
+            operand for operand in node.operands()
+            if (operand, name, value) not in cache
+        ]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        budget -= 1
+        if budget < 0:
+            return None
+        cache[node, name, value] = rewrite(node, [
+            cache[operand, name, value] for operand in node.operands()
+        ], known)
+    return cache[sentence, name, value]
+
+
+def connect(cls, operands):
+    """
+    Returns the simplified conjunction (`cls` And) or disjunction (`cls` Or)
+    of `operands`: nested ones are flattened, duplicates removed, and
+    constants and complementary pairs folded.
+    """
+    identity, absorbing = (TRUE, FALSE) if cls is And else (FALSE, TRUE)
+
+    flat = []
+    seen = set()
+    stack = list(reversed(operands))
+    while stack:
+        operand = stack.pop()
+        if isinstance(operand, cls) and operand is not identity:
+            stack.extend(reversed(operand.operands()))
+        elif operand is absorbing:
+            return absorbing
+        elif operand is not identity and operand not in seen:
+            seen.add(operand)
+            flat.append(operand)
+
+    # A sentence together with its negation decides the whole connective
+    if any(isinstance(operand, Not) and operand.operand in seen
+           for operand in flat):
+        return absorbing
+
+    if not flat:
+        return identity
+    if len(flat) == 1:
+        return flat[0]
+    return cls(*flat)
+
+
+def rewrite(node, operands, known, cache=None):
+    """
+    Returns the simplified form of `node`, given its simplified `operands`
+    and the values of the symbols in `known`. Given a `cache` of cofactors,
+    a literal on one side of an implication or biconditional also splits
+    the other side.
+    """
+    if isinstance(node, Symbol):
+        if node.name in known:
+            return TRUE if known[node.name] else FALSE
+        return node
+
+    if isinstance(node, Not):
+        return negate(operands[0])
+
+    if isinstance(node, (And, Or)):
+        return connect(type(node), operands)
+
+    if isinstance(node, Implication):
+        a, b = operands
+        if a is TRUE:
+            return b
+        if a is FALSE or b is TRUE or a is b:
+            return TRUE
+        if b is FALSE:
+            return negate(a)
+
+        # The consequent only matters when a literal antecedent is true
+        if cache is not None and literal(a) is not None:
+            b = cofactor(b, literal(a), True, cache) or b
+            if b is TRUE:
+                return TRUE
+        elif cache is not None and literal(b) is not None:
+            a = cofactor(a, literal(b), False, cache) or a
+            if a is FALSE:
+                return TRUE
+        return Implication(a, b)
+
+    if isinstance(node, Biconditional):
+        a, b = operands
+        if a is b:
+            return TRUE
+        if a is negate(b):
+            return FALSE
+        if a is TRUE:
+            return b
+        if b is TRUE:
+            return a
+        if a is FALSE:
+            return negate(b)
+        if b is FALSE:
+            return negate(a)
+
+        # With a literal on one side, split the other on that literal
+        if literal(a) is None:
+            a, b = b, a
+        if cache is not None and literal(a) is not None:
+            when_true = cofactor(b, literal(a), True, cache)
+            when_false = cofactor(b, literal(a), False, cache)
+            if when_true is None or when_false is None:
+                return Biconditional(a, b)
+            if when_true is TRUE:
+                return connect(Or, [a, negate(when_false)])
+            if when_true is FALSE:
+                return connect(And, [negate(a), negate(when_false)])
+            if when_false is FALSE:
+                return connect(Or, [negate(a), when_true])
+            if when_false is TRUE:
+                return connect(And, [a, when_true])
+        return Biconditional(a, b)
+
+    raise TypeError(f"cannot simplify {node!r}")
+
+
+def substitute(sentence, known, cache=None):
+    """
+    Simplifies every node of `sentence` bottom up, keeping the cofactors
+    it splits on in `cache`.
+    """
+    if cache is None:
+        cache = dict()
+    results = dict()
+    stack = [sentence]
+    while stack:
+        node = stack[-1]
+        if node in results:
+            stack.pop()
+            continue
+        pending = [
+            operand for operand in node.operands() if operand not in results
+        ]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        results[node] = rewrite(
+            node, [results[operand] for operand in node.operands()], known,
+            cache
+        )
+    return results[sentence]
+
+
+def literals(sentence):
+    """
+    Returns the values that `sentence` forces on symbols through unit
+    literals among its top-level conjuncts.
+    """
+    conjuncts = sentence.operands() if isinstance(sentence, And) \
+        else (sentence,)
+    return dict(
+        literal(conjunct) for conjunct in conjuncts
+        if literal(conjunct) is not None
+    )
+
+
+def simplify(sentence, assignment=None):
+    """
+    Returns a smaller sentence equivalent to `sentence`, with any symbols
+    in `assignment` replaced by their values.
+
+    Conjunctions and disjunctions are flattened and deduplicated, constants
+    are folded, and unit literals among the top-level conjuncts are
+    propagated into the rest of the sentence until nothing changes.
+    """
+    known = dict(assignment or {})
+    units = dict()
+
+    # Cofactors do not depend on `known`, so every pass can share them
+    cache = dict()
+    result = substitute(sentence, known, cache)
+    while result is not FALSE:
+        found = {
+            name: value for name, value in literals(result).items()
+            if name not in known
+        }
+        if not found:
+            break
+        known.update(found)
+        units.update(found)
+        result = substitute(result, known, cache)
+
+    # Keep the propagated literals as conjuncts
+    if result is FALSE:
+        return FALSE
+    return connect(And, [
+        Symbol(name) if value else Not(Symbol(name))
+        for name, value in units.items()
+    ] + [result])
+
+
+def prepare(knowledge, queries):
+    """
+    Simplifies knowledge base and queries before checking entailment.
+    Queries are also simplified with the unit literals knowledge base forces.
+    """
+    knowledge = simplify(knowledge)
+    units = literals(knowledge)
+    return knowledge, [simplify(query, units) for query in queries]
+
+
+def report(sentence):
+    """Returns the simplified sentence and the sizes before and after."""
+    simplified = simplify(sentence)
+    return {
+        "sentence": simplified,
+        "before": size(sentence),
+        "after": size(simplified)
+    }
+
+
+def nested(depth):
+    """
+    Returns the chain A0 <=> (A1 <=> (... <=> A`depth`)), with every
+    symbol of even index also conjoined at the bottom, whose literal
+    splits once took time exponential in `depth`.
+    """
+    sentence = And(Symbol(f"A{depth}"), *[
+        Symbol(f"A{i}") for i in range(0, depth, 2)
+    ])
+    for i in reversed(range(depth)):
+        sentence = Biconditional(Symbol(f"A{i}"), sentence)
+    return sentence
+
+
+def main():
+    # Simplify the puzzles' knowledge bases. The puzzles are imported here,
+    # not at the top, as model_check loads this module and has no need of them
+    import puzzle
+    for name, sentence in sorted(vars(puzzle).items()):
+        if not name.startswith("knowledge"):
+            continue
+        result = report(sentence)
+        reduction = 1 - result["after"] / result["before"]
+        print(f"{name}: {result['before']} -> {result['after']} "
+              f"nodes ({reduction:.0%} smaller)")
+        print(f"    {result['sentence'].formula()}")
+
+    # Time should grow about linearly with the depth of nesting
+    for depth in (16, 64, 256, 1024):
+        start = time.perf_counter()
+        result = report(nested(depth))
+        print(f"nested depth {depth}: {result['before']} -> "
+              f"{result['after']} nodes in "
+              f"{time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
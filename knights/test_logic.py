@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import puzzle
+from logic import *
+
+SYMBOLS = [Symbol(name) for name in "ABCD"]
+PUZZLE_SYMBOLS = [
+    puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+    puzzle.BKnave, puzzle.CKnight, puzzle.CKnave
+]
+
+
+def random_sentence(rng, depth):
+    """Return a random sentence over `SYMBOLS` nested up to `depth` deep."""
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(SYMBOLS)
+    kind = rng.choice([Not, And, Or, Implication, Biconditional])
+    if kind is Not:
+        return Not(random_sentence(rng, depth - 1))
+    if kind in (And, Or):
+        return kind(*[
+            random_sentence(rng, depth - 1) for _ in range(rng.randint(2, 3))
+        ])
+    return kind(
+        random_sentence(rng, depth - 1), random_sentence(rng, depth - 1)
+    )
+
+
+def cases():
+    """Yield every puzzle question, then random (knowledge, query) pairs."""
+    for name, knowledge in sorted(vars(puzzle).items()):
+        if name.startswith("knowledge"):
+            for symbol in PUZZLE_SYMBOLS:
+                yield knowledge, symbol
+    rng = random.Random(0)
+    for _ in range(60):
+        knowledge = And(*[random_sentence(rng, 3) for _ in range(2)])
+        yield knowledge, random_sentence(rng, 2)
+
+
+@pytest.mark.parametrize("simplify", [False, True])
+@pytest.mark.parametrize("backend", sorted(set(BACKENDS) - {"enumerate"}))
+def test_backend_agrees_with_enumerate(backend, simplify):
+    for knowledge, query in cases():
+        expected = model_check(knowledge, query)
+        assert model_check(
+            knowledge, query, backend=backend, simplify=simplify
+        ) == expected, (knowledge.formula(), query.formula())
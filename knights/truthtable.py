@@ -0,0 +1,168 @@
+from logic import *
+
+# Number of symbols whose assignments are packed into one chunk of bits
+CHUNK_BITS = 20
+
+
+def program(sentences):
+    """
+    Returns every distinct node of `sentences` in evaluation order, as a list
+    of (node, operand positions, released positions) triples, and the
+    position of each sentence. The released positions are the operands no
+    later step reads, other than the sentences themselves.
+    """
+    steps = []
+    positions = dict()
+    for sentence in sentences:
+        stack = [sentence]
+        while stack:
+            node = stack[-1]
+            if node in positions:
+                stack.pop()
+                continue
+            pending = [
+                operand for operand in node.operands()
+                if operand not in positions
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            positions[node] = len(steps)
+            steps.append(
+                (node, [positions[operand] for operand in node.operands()], [])
+            )
+    results = [positions[sentence] for sentence in sentences]
+
+    # Release each operand after the last step that reads it
+    last = dict()
+    for i, (_, operands, _) in enumerate(steps):
+        for operand in operands:
+            last[operand] = i
+    for operand in set(last) - set(results):
+        steps[last[operand]][2].append(operand)
+    return steps, results
+
+
+def column(bit, width):
+    """
+    Returns the column of symbol number `bit` within a chunk of `width`
+    assignments: bit k is set if bit `bit` of k is set.
+    """
+    block = 1 << bit
+    result = ((1 << block) - 1) << block
+    size = 2 * block
+
+    # Repeat the pattern by doubling it until it fills the chunk
+    while size < width:
+        result |= result << size
+        size *= 2
+    return result
+
+
+def evaluate(steps, columns, mask):
+    """
+    Evaluates every step of a program over whole columns of assignments,
+    where `mask` has a bit set for every assignment in the chunk. Columns
+    are dropped once released, so only those of the sentences are kept.
+    """
+    values = []
+    for node, operands, released in steps:
+        if isinstance(node, Symbol):
+            value = columns[node.name]
+        elif isinstance(node, Not):
+            value = mask ^ values[operands[0]]
+        elif isinstance(node, And):
+            value = mask
+            for operand in operands:
+                value &= values[operand]
+        elif isinstance(node, Or):
+            value = 0
+            for operand in operands:
+                value |= values[operand]
+        elif isinstance(node, Implication):
+            value = (mask ^ values[operands[0]]) | values[operands[1]]
+        elif isinstance(node, Biconditional):
+            value = mask ^ values[operands[0]] ^ values[operands[1]]
+        else:
+            raise TypeError(f"cannot evaluate {node!r}")
+        values.append(value)
+        for position in released:
+            values[position] = None
+    return values
+
+
+def chunks(symbols):
+    """
+    Yields the columns of every symbol and the mask of valid assignments
+    for each chunk of the truth table over `symbols`.
+    """
+    symbols = sorted(symbols)
+    low = symbols[:CHUNK_BITS]
+    high = symbols[CHUNK_BITS:]
+
+    # Symbols packed within a chunk have the same columns in every chunk
+    width = 1 << len(low)
+    mask = (1 << width) - 1
+    packed = {name: column(bit, width) for bit, name in enumerate(low)}
+
+    # Remaining symbols are constant within a chunk
+    for index in range(1 << len(high)):
+        columns = dict(packed)
+        for bit, name in enumerate(high):
+            columns[name] = mask if index >> bit & 1 else 0
+        yield columns, mask
+
+
+def entails(knowledge, query, stats=None):
+    """Checks if knowledge base entails query one chunk of models at a time."""
+    steps, (kb, q) = program([knowledge, query])
+    symbols = set.union(knowledge.symbols(), query.symbols())
+
+    entailed = True
+    explored = 0
+    for columns, mask in chunks(symbols):
+        values = evaluate(steps, columns, mask)
+        explored += mask.bit_length()
+
+        # A model of the knowledge base where the query is false
+        if values[kb] & (mask ^ values[q]):
+            entailed = False
+            break
+
+    if stats is not None:
+        stats["explored"] = explored
+    return entailed
+
+
+def count_models(sentence):
+    """Returns the number of assignments to its symbols that satisfy sentence."""
+    steps, (position,) = program([sentence])
+    return sum(
+        evaluate(steps, columns, mask)[position].bit_count()
+        for columns, mask in chunks(sentence.symbols())
+    )
+
+
+def entails_all(knowledge, queries, stats=None):
+    """Checks which queries knowledge base entails over one truth table."""
+    steps, positions = program([knowledge] + list(queries))
+    symbols = set.union(
+        knowledge.symbols(), *[query.symbols() for query in queries]
+    )
+
+    entailed = [True] * len(queries)
+    explored = 0
+    for columns, mask in chunks(symbols):
+        values = evaluate(steps, columns, mask)
+        explored += mask.bit_length()
+        kb = values[positions[0]]
+        for i, position in enumerate(positions[1:]):
+            if kb & (mask ^ values[position]):
+                entailed[i] = False
+        if not any(entailed):
+            break
+
+    if stats is not None:
+        stats["explored"] = explored
+    return entailed